@@ -0,0 +1,125 @@
+"""
+Shared upload handling for the transcription endpoints
+"""
+
+from pathlib import Path
+from typing import BinaryIO, FrozenSet, Optional
+import io
+import os
+import uuid
+
+import anyio
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+from app.core import buffer_pool
+
+# Directory for uploaded audio; created once at startup
+UPLOAD_DIR = Path(settings.UPLOAD_DIR)
+
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = buffer_pool.BUFFER_SIZE
+
+# Uploads smaller than this are written with a single write instead of being streamed
+SMALL_UPLOAD_SIZE = 4 * 1024 * 1024
+
+# Bounds concurrent blocking file operations, independently of model calls
+IO_LIMITER = anyio.CapacityLimiter(32)
+
+def _too_large(max_bytes: int) -> HTTPException:
+    """Build the 413 error for an upload over `max_bytes`"""
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size: {max_bytes / (1024*1024):.1f}MB"
+    )
+
+def _file_descriptor(src: BinaryIO) -> Optional[int]:
+    """
+    File descriptor behind `src`, or None for purely in-memory streams
+
+    An in-memory SpooledTemporaryFile rolls over to disk here; uploads small
+    enough to still be in memory normally take accept_upload's single-write path.
+    """
+    try:
+        return src.fileno()
+    except (io.UnsupportedOperation, OSError):
+        return None
+
+def _copy_upload(src: BinaryIO, path: Path, limit: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """Copy an upload spool to disk, stopping as soon as more than `limit` bytes were copied"""
+    written = 0
+    src_fd = _file_descriptor(src) if hasattr(os, 'sendfile') else None
+    with open(path, 'wb') as dst:
+        # Sources backed by a real file are copied inside the kernel
+        if src_fd is not None:
+            dst_fd = dst.fileno()
+            while written <= limit:
+                sent = os.sendfile(dst_fd, src_fd, written, chunk_size)
+                if not sent:
+                    break
+                written += sent
+            return written
+
+        # In-memory spools are copied through a pooled buffer
+        src.seek(0)
+        buf = buffer_pool.acquire()
+        view = memoryview(buf)
+        try:
+            while written <= limit:
+                n = src.readinto(buf)
+                if not n:
+                    break
+                dst.write(view[:n])
+                written += n
+        finally:
+            buffer_pool.release(buf)
+    return written
+
+def validate_upload(file: UploadFile, allowed_ext: FrozenSet[str], max_bytes: int) -> str:
+    """Check the upload's name, extension and declared size; return its lowercase extension"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    extension = os.path.splitext(file.filename)[1].lower()
+    if extension not in allowed_ext:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format: {file.filename}. Supported: {', '.join(sorted(allowed_ext))}"
+        )
+
+    if file.size and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    return extension
+
+async def accept_upload(
+    file: UploadFile,
+    upload_dir: Path,
+    allowed_ext: FrozenSet[str],
+    max_bytes: int
+) -> Path:
+    """
+    Validate an upload and save it under a fresh unique name in `upload_dir`
+
+    The saved file's stem is the generated ID. Nothing is left on disk if
+    validation or saving fails.
+    """
+    extension = validate_upload(file, allowed_ext, max_bytes)
+    path = upload_dir / f"{uuid.uuid4().hex}{extension}"
+
+    try:
+        if file.size is not None and file.size < min(SMALL_UPLOAD_SIZE, max_bytes):
+            await file.seek(0)
+            content = await file.read()
+            await anyio.to_thread.run_sync(path.write_bytes, content, limiter=IO_LIMITER)
+            return path
+
+        written = await anyio.to_thread.run_sync(
+            _copy_upload, file.file, path, max_bytes, limiter=IO_LIMITER
+        )
+        if written > max_bytes:
+            raise _too_large(max_bytes)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
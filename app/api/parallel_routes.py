@@ -3,26 +3,51 @@ Parallel Processing API Routes
 Provides endpoints for high-performance parallel Whisper + NeMo processing
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form, Request
+from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form, Request, Depends
 from fastapi.responses import JSONResponse
 from typing import Optional, List, Dict, Any
 from pathlib import Path
-import uuid
+import asyncio
 import time
+import anyio
 
 from app.services.parallel_diarization_service import ParallelDiarizationService
 from app.models.transcription import TranscriptionRequest, TranscriptionResult
 from app.core.config import settings
+from app.api._upload import UPLOAD_DIR, IO_LIMITER, accept_upload, validate_upload
+from app.utils.batching import bucket_by_duration, probe_duration
 
 # Initialize router
 parallel_router = APIRouter(prefix="/api/v1/parallel", tags=["parallel-processing"])
 
-# Get parallel service from app state
-async def get_parallel_service(request: Request) -> ParallelDiarizationService:
-    """Dependency to get the parallel diarization service from app state"""
-    if not hasattr(request.app.state, 'parallel_diarization_service'):
+# Accepted audio file extensions (lowercase, with leading dot)
+_ALLOWED_EXT = frozenset({'.wav', '.mp3', '.m4a', '.flac', '.ogg'})
+
+# Maximum number of files accepted by the batch endpoint
+MAX_BATCH_FILES = 10
+
+# Bounds how many audio files are processed at once across all requests
+GPU_LIMITER = anyio.CapacityLimiter(settings.MAX_CONCURRENT_GPU_JOBS)
+
+async def _process_bounded(
+    parallel_service: ParallelDiarizationService,
+    file_path: Path,
+    request: TranscriptionRequest
+) -> TranscriptionResult:
+    """Run parallel processing once a GPU slot is free"""
+    # The service already offloads its model work to its own thread pool
+    async with GPU_LIMITER:
+        return await parallel_service.process_audio_parallel(file_path, request)
+
+# Parallel service instance, set by the application lifespan
+_SERVICE: Optional[ParallelDiarizationService] = None
+
+async def get_parallel_service() -> ParallelDiarizationService:
+    """Dependency to get the parallel diarization service"""
+    service = _SERVICE
+    if service is None:
         raise HTTPException(status_code=503, detail="Parallel service not available")
-    return request.app.state.parallel_diarization_service
+    return service
 
 @parallel_router.post("/transcribe")
 async def transcribe_parallel(
@@ -33,7 +58,8 @@ async def transcribe_parallel(
     whisper_model: Optional[str] = Form("medium.en"),
     suppress_numerals: Optional[bool] = Form(False),
     source_separation: Optional[bool] = Form(True),
-    enhanced_alignment: Optional[bool] = Form(True)
+    enhanced_alignment: Optional[bool] = Form(True),
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
 ) -> Dict[str, Any]:
     """
     Process audio with parallel Whisper + NeMo processing
@@ -41,26 +67,10 @@ async def transcribe_parallel(
     This endpoint runs Whisper transcription and NeMo diarization simultaneously
     for maximum performance and efficiency.
     """
-    parallel_service = await get_parallel_service(request)
-    
     try:
-        # Validate file
-        if not file.filename or not file.filename.lower().endswith(('.wav', '.mp3', '.m4a', '.flac', '.ogg')):
-            raise HTTPException(status_code=400, detail="Invalid audio file format")
-        
-        # Create unique filename
-        file_id = str(uuid.uuid4())
-        file_extension = Path(file.filename).suffix
-        filename = f"{file_id}{file_extension}"
-        file_path = Path("uploads") / filename
-        
-        # Ensure uploads directory exists
-        file_path.parent.mkdir(exist_ok=True)
-        
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Validate and save uploaded file
+        file_path = await accept_upload(file, UPLOAD_DIR, _ALLOWED_EXT, settings.MAX_FILE_SIZE)
+        file_id = file_path.stem
         
         # Create transcription request
         request = TranscriptionRequest(
@@ -73,10 +83,10 @@ async def transcribe_parallel(
         )
         
         # Process audio in parallel
-        result = await parallel_service.process_audio_parallel(file_path, request)
+        result = await _process_bounded(parallel_service, file_path, request)
         
         # Clean up uploaded file
-        background_tasks.add_task(lambda: file_path.unlink(missing_ok=True))
+        background_tasks.add_task(file_path.unlink, missing_ok=True)
         
         return {
             "success": True,
@@ -89,10 +99,12 @@ async def transcribe_parallel(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Clean up file on error
         if 'file_path' in locals():
-            background_tasks.add_task(lambda: file_path.unlink(missing_ok=True))
+            background_tasks.add_task(file_path.unlink, missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 @parallel_router.post("/transcribe/async")
@@ -104,31 +116,16 @@ async def transcribe_parallel_async(
     whisper_model: Optional[str] = Form("medium.en"),
     suppress_numerals: Optional[bool] = Form(False),
     source_separation: Optional[bool] = Form(True),
-    enhanced_alignment: Optional[bool] = Form(True)
+    enhanced_alignment: Optional[bool] = Form(True),
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
 ) -> Dict[str, Any]:
     """
     Start async parallel processing and return task ID for status tracking
     """
-    parallel_service = await get_parallel_service(request)
-    
     try:
-        # Validate file
-        if not file.filename or not file.filename.lower().endswith(('.wav', '.mp3', '.m4a', '.flac', '.ogg')):
-            raise HTTPException(status_code=400, detail="Invalid audio file format")
-        
-        # Create unique filename
-        file_id = str(uuid.uuid4())
-        file_extension = Path(file.filename).suffix
-        filename = f"{file_id}{file_extension}"
-        file_path = Path("uploads") / filename
-        
-        # Ensure uploads directory exists
-        file_path.parent.mkdir(exist_ok=True)
-        
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Validate and save uploaded file
+        file_path = await accept_upload(file, UPLOAD_DIR, _ALLOWED_EXT, settings.MAX_FILE_SIZE)
+        file_id = file_path.stem
         
         # Create transcription request
         request = TranscriptionRequest(
@@ -142,7 +139,8 @@ async def transcribe_parallel_async(
         
         # Start processing in background
         background_tasks.add_task(
-            parallel_service.process_audio_parallel,
+            _process_bounded,
+            parallel_service,
             file_path,
             request
         )
@@ -158,18 +156,19 @@ async def transcribe_parallel_async(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Clean up file on error
         if 'file_path' in locals():
-            background_tasks.add_task(lambda: file_path.unlink(missing_ok=True))
+            background_tasks.add_task(file_path.unlink, missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Failed to start processing: {str(e)}")
 
 @parallel_router.get("/status/{task_id}")
-async def get_parallel_status(task_id: str) -> Dict[str, Any]:
+async def get_parallel_status(task_id: str,
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
+) -> Dict[str, Any]:
     """Get status of a parallel processing task"""
-    if not parallel_service:
-        raise HTTPException(status_code=503, detail="Parallel service not available")
-    
     try:
         status = parallel_service.get_task_status(task_id)
         if not status:
@@ -187,11 +186,10 @@ async def get_parallel_status(task_id: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
 
 @parallel_router.get("/result/{task_id}")
-async def get_parallel_result(task_id: str) -> Dict[str, Any]:
+async def get_parallel_result(task_id: str,
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
+) -> Dict[str, Any]:
     """Get result of a completed parallel processing task"""
-    if not parallel_service:
-        raise HTTPException(status_code=503, detail="Parallel service not available")
-    
     try:
         status = parallel_service.get_task_status(task_id)
         if not status:
@@ -216,11 +214,10 @@ async def get_parallel_result(task_id: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to get result: {str(e)}")
 
 @parallel_router.get("/stats")
-async def get_parallel_stats() -> Dict[str, Any]:
+async def get_parallel_stats(
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
+) -> Dict[str, Any]:
     """Get parallel processing statistics"""
-    if not parallel_service:
-        raise HTTPException(status_code=503, detail="Parallel service not available")
-    
     try:
         stats = parallel_service.get_processing_stats()
         active_tasks = parallel_service.get_active_tasks()
@@ -242,11 +239,10 @@ async def get_parallel_stats() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
 @parallel_router.get("/features")
-async def get_parallel_features() -> Dict[str, Any]:
+async def get_parallel_features(
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
+) -> Dict[str, Any]:
     """Get information about parallel processing features"""
-    if not parallel_service:
-        raise HTTPException(status_code=503, detail="Parallel service not available")
-    
     try:
         features = parallel_service.get_supported_features()
         
@@ -280,7 +276,8 @@ async def batch_transcribe_parallel(
     whisper_model: Optional[str] = Form("medium.en"),
     suppress_numerals: Optional[bool] = Form(False),
     source_separation: Optional[bool] = Form(True),
-    enhanced_alignment: Optional[bool] = Form(True)
+    enhanced_alignment: Optional[bool] = Form(True),
+    parallel_service: ParallelDiarizationService = Depends(get_parallel_service)
 ) -> Dict[str, Any]:
     """
     Process multiple audio files with parallel processing
@@ -288,52 +285,66 @@ async def batch_transcribe_parallel(
     This endpoint processes multiple files concurrently, with each file
     using parallel Whisper + NeMo processing internally.
     """
-    if not parallel_service or not parallel_service.initialized:
+    if not parallel_service.initialized:
         raise HTTPException(status_code=503, detail="Parallel service not available")
     
     if not files or len(files) == 0:
         raise HTTPException(status_code=400, detail="No files provided")
     
-    if len(files) > 10:  # Limit batch size
-        raise HTTPException(status_code=400, detail="Maximum 10 files per batch")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_BATCH_FILES} files per batch")
     
     try:
         results = []
         uploaded_files = []
         
+        # Validate every file before saving any of them
         for file in files:
-            # Validate file
-            if not file.filename or not file.filename.lower().endswith(('.wav', '.mp3', '.m4a', '.flac', '.ogg')):
-                raise HTTPException(status_code=400, detail=f"Invalid audio file format: {file.filename}")
-            
-            # Create unique filename
-            file_id = str(uuid.uuid4())
-            file_extension = Path(file.filename).suffix
-            filename = f"{file_id}{file_extension}"
-            file_path = Path("uploads") / filename
-            
-            # Ensure uploads directory exists
-            file_path.parent.mkdir(exist_ok=True)
-            
-            # Save uploaded file
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            uploaded_files.append(file_path)
-            
-            # Create transcription request
-            request = TranscriptionRequest(
-                language=language,
-                whisper_model=whisper_model,
-                suppress_numerals=suppress_numerals,
-                source_separation=source_separation,
-                enhanced_alignment=enhanced_alignment,
-                parallel_processing=True
+            validate_upload(file, _ALLOWED_EXT, settings.MAX_FILE_SIZE)
+        
+        # Save all uploaded files concurrently
+        saved = await asyncio.gather(
+            *[accept_upload(file, UPLOAD_DIR, _ALLOWED_EXT, settings.MAX_FILE_SIZE) for file in files],
+            return_exceptions=True
+        )
+        uploaded_files = [fp for fp in saved if isinstance(fp, Path)]
+        for outcome in saved:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        
+        # Create transcription request
+        request = TranscriptionRequest(
+            language=language,
+            whisper_model=whisper_model,
+            suppress_numerals=suppress_numerals,
+            source_separation=source_separation,
+            enhanced_alignment=enhanced_alignment,
+            parallel_processing=True
+        )
+        
+        # Group files of similar duration and process each group concurrently
+        durations = await anyio.to_thread.run_sync(
+            lambda: [probe_duration(fp) for fp in uploaded_files], limiter=IO_LIMITER
+        )
+        batches = bucket_by_duration(durations, max_batch_size=settings.BATCH_MAX_SIZE)
+        
+        outcomes = [None] * len(uploaded_files)
+        for batch in batches:
+            batch_results = await asyncio.gather(
+                *[_process_bounded(parallel_service, uploaded_files[i], request) for i in batch],
+                return_exceptions=True
             )
-            
-            # Process audio in parallel
-            result = await parallel_service.process_audio_parallel(file_path, request)
+            for i, outcome in zip(batch, batch_results):
+                outcomes[i] = outcome
+        
+        for file, result in zip(files, outcomes):
+            if isinstance(result, Exception):
+                results.append({
+                    "filename": file.filename,
+                    "status": "failed",
+                    "error": str(result)
+                })
+                continue
             results.append({
                 "filename": file.filename,
                 "task_id": result.id,
@@ -345,7 +356,7 @@ async def batch_transcribe_parallel(
         
         # Clean up uploaded files
         for file_path in uploaded_files:
-            background_tasks.add_task(lambda fp: fp.unlink(missing_ok=True), file_path)
+            background_tasks.add_task(file_path.unlink, missing_ok=True)
         
         return {
             "success": True,
@@ -362,10 +373,10 @@ async def batch_transcribe_parallel(
     except HTTPException:
         # Clean up files on error
         for file_path in uploaded_files:
-            background_tasks.add_task(lambda fp: fp.unlink(missing_ok=True), file_path)
+            background_tasks.add_task(file_path.unlink, missing_ok=True)
         raise
     except Exception as e:
         # Clean up files on error
         for file_path in uploaded_files:
-            background_tasks.add_task(lambda fp: fp.unlink(missing_ok=True), file_path)
+            background_tasks.add_task(file_path.unlink, missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Batch processing failed: {str(e)}")
@@ -6,7 +6,6 @@ import uuid
 import time
 from typing import List, Optional
 from pathlib import Path
-import aiofiles
 import structlog
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, BackgroundTasks, Query
@@ -30,15 +29,33 @@ transcription_router = APIRouter()
 
 # Import parallel routes
 from app.api.parallel_routes import parallel_router
+from app.api._upload import UPLOAD_DIR, accept_upload
+
+# Accepted audio file extensions, built once from settings
+_ALLOWED_EXT = frozenset('.' + ext.lower() for ext in settings.SUPPORTED_FORMATS)
+
+# Media types for downloadable output formats
+_DOWNLOAD_MEDIA_TYPES = {
+    "json": "application/json",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+    "txt": "text/plain",
+    "rttm": "text/plain",
+    "csv": "text/csv",
+}
 
 # In-memory storage for demo purposes (use Redis/DB in production)
 transcription_jobs = {}
 
-async def get_diarization_service(request: Request):
+# Diarization service instance, set by the application lifespan
+_SERVICE = None
+
+async def get_diarization_service():
     """Dependency to get the diarization service"""
-    if not hasattr(request.app.state, 'diarization_service'):
+    service = _SERVICE
+    if service is None:
         raise HTTPException(status_code=503, detail="Diarization service not available")
-    return request.app.state.diarization_service
+    return service
 
 @transcription_router.post("/transcribe", response_model=TranscriptionResult)
 async def transcribe_audio(
@@ -52,11 +69,12 @@ async def transcribe_audio(
     source_separation: bool = Query(True, description="Enable source separation for better quality"),
     parallel_processing: bool = Query(True, description="Enable parallel processing for faster results"),
     enhanced_alignment: bool = Query(True, description="Enable enhanced alignment and punctuation"),
-    output_format: str = Query("json", description="Output format")
+    output_format: str = Query("json", description="Output format"),
+    diarization_service = Depends(get_diarization_service)
 ):
     """Transcribe audio file with optional speaker diarization"""
     
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
     start_time = time.time()
     
     try:
@@ -64,30 +82,8 @@ async def transcribe_audio(
         log_request(request_id, "/transcribe", "POST", 
                    file_size=file.size, language=language, task=task)
         
-        # Validate file
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No file provided")
-        
-        # Check file size
-        if file.size and file.size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413, 
-                detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
-            )
-        
-        # Check file format
-        file_ext = Path(file.filename).suffix.lower().lstrip('.')
-        if file_ext not in settings.SUPPORTED_FORMATS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file format. Supported: {', '.join(settings.SUPPORTED_FORMATS)}"
-            )
-        
-        # Save uploaded file
-        upload_path = Path(settings.UPLOAD_DIR) / f"{request_id}_{file.filename}"
-        async with aiofiles.open(upload_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # Validate and save uploaded file
+        upload_path = await accept_upload(file, UPLOAD_DIR, _ALLOWED_EXT, settings.MAX_FILE_SIZE)
         
         # Create transcription request
         transcription_request = TranscriptionRequest(
@@ -101,9 +97,6 @@ async def transcribe_audio(
             output_format=output_format
         )
         
-        # Get diarization service
-        diarization_service = await get_diarization_service(request)
-        
         # Process audio
         result = await diarization_service.process_audio(upload_path, transcription_request)
         
@@ -115,7 +108,7 @@ async def transcribe_audio(
                     transcription_id=result.transcription_id)
         
         # Cleanup uploaded file
-        background_tasks.add_task(lambda: upload_path.unlink(missing_ok=True))
+        background_tasks.add_task(upload_path.unlink, missing_ok=True)
         
         return result
         
@@ -133,7 +126,7 @@ async def batch_transcribe(
 ):
     """Batch transcription endpoint"""
     
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
     start_time = time.time()
     
     try:
@@ -162,7 +155,7 @@ async def get_transcription_status(
 ):
     """Get transcription job status"""
     
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
     
     try:
         log_request(request_id, f"/transcribe/{transcription_id}", "GET")
@@ -191,7 +184,8 @@ async def download_transcription(
 ):
     """Download transcription in specified format"""
     
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
+    start_time = time.time()
     
     try:
         log_request(request_id, f"/transcribe/{transcription_id}/download", "GET", format=format)
@@ -204,14 +198,22 @@ async def download_transcription(
         if status.status != "completed":
             raise HTTPException(status_code=400, detail="Transcription not yet completed")
         
-        # Generate output file based on format
+        media_type = _DOWNLOAD_MEDIA_TYPES.get(format)
+        if media_type is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported download format. Supported: {', '.join(_DOWNLOAD_MEDIA_TYPES)}"
+            )
+        
         output_path = Path(settings.OUTPUT_DIR) / f"{transcription_id}.{format}"
+        if not output_path.is_file():
+            raise HTTPException(status_code=404, detail=f"No {format} output available for this transcription")
         
-        # This is a placeholder - implement format conversion logic
-        raise HTTPException(
-            status_code=501, 
-            detail=f"Download in {format} format not yet implemented"
-        )
+        response_time = time.time() - start_time
+        log_response(request_id, 200, response_time, transcription_id=transcription_id)
+        
+        # Let the server stream the file from disk instead of reading it into memory
+        return FileResponse(output_path, media_type=media_type, filename=output_path.name)
         
     except HTTPException:
         raise
@@ -227,7 +229,7 @@ async def delete_transcription(
 ):
     """Delete transcription job and associated files"""
     
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
     
     try:
         log_request(request_id, f"/transcribe/{transcription_id}", "DELETE")
@@ -254,10 +256,12 @@ async def delete_transcription(
         raise HTTPException(status_code=500, detail=error_msg)
 
 @transcription_router.get("/features")
-async def get_features(request: Request):
+async def get_features(
+    request: Request,
+    diarization_service = Depends(get_diarization_service)
+):
     """Get information about supported features"""
     try:
-        diarization_service = await get_diarization_service(request)
         return diarization_service.get_supported_features()
     except Exception as e:
         logger.error("Failed to get features", error=str(e))
@@ -0,0 +1,43 @@
+"""
+Reusable scratch buffers for upload streaming
+"""
+
+from collections import deque
+
+# Canonical chunk size used when copying uploads to disk
+BUFFER_SIZE = 1 << 20
+
+# Maximum number of idle buffers kept around
+MAX_POOLED_BUFFERS = 32
+
+class BufferPool:
+    """Pool of fixed-size bytearrays shared across requests"""
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE, max_buffers: int = MAX_POOLED_BUFFERS):
+        self.buffer_size = buffer_size
+        self.max_buffers = max_buffers
+        self._buffers: deque = deque()
+
+    def acquire(self) -> bytearray:
+        """Get a buffer from the pool, allocating a new one if the pool is empty"""
+        try:
+            return self._buffers.pop()
+        except IndexError:
+            return bytearray(self.buffer_size)
+
+    def release(self, buf: bytearray) -> None:
+        """Return a buffer to the pool; non-standard sizes are left to the GC"""
+        if len(buf) != self.buffer_size or len(self._buffers) >= self.max_buffers:
+            return
+        self._buffers.append(buf)
+
+# Shared pool for upload chunks
+upload_buffer_pool = BufferPool()
+
+def acquire() -> bytearray:
+    """Acquire a standard-size buffer from the shared pool"""
+    return upload_buffer_pool.acquire()
+
+def release(buf: bytearray) -> None:
+    """Release a buffer back to the shared pool"""
+    upload_buffer_pool.release(buf)
@@ -3,71 +3,87 @@ Configuration settings for the Whisper Diarization Service
 """
 
 import os
+import platform
+import tempfile
+from functools import lru_cache
 from typing import List
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 class Settings(BaseSettings):
     """Application settings"""
     
     # Server settings
-    HOST: str = Field(default="0.0.0.0", env="HOST")
-    PORT: int = Field(default=80, env="PORT")
-    DEBUG: bool = Field(default=False, env="DEBUG")
+    HOST: str = Field(default="0.0.0.0")
+    PORT: int = Field(default=80)
+    DEBUG: bool = Field(default=False)
     
     # CORS settings
-    ALLOWED_ORIGINS: List[str] = Field(
-        default=["*"],
-        env="ALLOWED_ORIGINS"
-    )
+    ALLOWED_ORIGINS: List[str] = Field(default=["*"])
     
     # Whisper settings
-    WHISPER_MODEL: str = Field(default="medium.en", env="WHISPER_MODEL")
-    WHISPER_DEVICE: str = Field(default="auto", env="WHISPER_DEVICE")
-    WHISPER_BATCH_SIZE: int = Field(default=16, env="WHISPER_BATCH_SIZE")
-    WHISPER_SUPPRESS_NUMERALS: bool = Field(default=True, env="WHISPER_SUPPRESS_NUMERALS")
+    WHISPER_MODEL: str = Field(default="medium.en")
+    WHISPER_DEVICE: str = Field(default="auto")
+    WHISPER_BATCH_SIZE: int = Field(default=16)
+    WHISPER_BEAM_SIZE: int = Field(default=1)  # Greedy decoding; raise for accuracy-critical use
+    WHISPER_SUPPRESS_NUMERALS: bool = Field(default=True)
+    WHISPER_COMPUTE_TYPE: str = Field(default="int8_float16")  # CTranslate2 quantization; "float16" for accuracy-critical use
+    CT2_MODEL_DIR: str = Field(default="")  # Prebuilt CTranslate2 model directory; WHISPER_MODEL is downloaded when empty
     
     # NeMo settings
-    NEMO_DEVICE: str = Field(default="auto", env="NEMO_DEVICE")
-    NEMO_BATCH_SIZE: int = Field(default=32, env="NEMO_BATCH_SIZE")
+    NEMO_DEVICE: str = Field(default="auto")
+    NEMO_BATCH_SIZE: int = Field(default=32)
     
     # Audio processing settings
-    MAX_AUDIO_DURATION: int = Field(default=3600, env="MAX_AUDIO_DURATION")  # 1 hour
-    SUPPORTED_FORMATS: List[str] = Field(
-        default=["wav", "mp3", "m4a", "flac", "ogg"],
-        env="SUPPORTED_FORMATS"
-    )
+    MAX_AUDIO_DURATION: int = Field(default=3600)  # 1 hour
+    SUPPORTED_FORMATS: List[str] = Field(default=["wav", "mp3", "m4a", "flac", "ogg"])
+    
+    # CPU math/memory tuning (oneDNN BF16, transparent huge pages); on by default on Arm hosts
+    ARM_OPTIMIZATIONS: bool = Field(default=platform.machine().lower() in ("aarch64", "arm64"))
+    
+    # Concurrency settings
+    MAX_CONCURRENT_GPU_JOBS: int = Field(default=1)
+    MAX_CONCURRENT_JOBS: int = Field(default=4)  # Single-file requests processed at once
+    MEMORY_CONSTRAINED: bool = Field(default=False)  # Keep Whisper weights off the GPU while diarization runs
+    FAST_MODEL_CONSTRUCT: bool = Field(default=True)  # Build mock results without pydantic validation
+    
+    # Batch settings
+    BATCH_MAX_SIZE: int = Field(default=4)  # Files processed concurrently per duration bucket
     
     # Storage settings
-    UPLOAD_DIR: str = Field(default="./uploads", env="UPLOAD_DIR")
-    OUTPUT_DIR: str = Field(default="./outputs", env="OUTPUT_DIR")
-    MAX_FILE_SIZE: int = Field(default=500 * 1024 * 1024, env="MAX_FILE_SIZE")  # 500MB
+    UPLOAD_DIR: str = Field(default="./uploads")
+    OUTPUT_DIR: str = Field(default="./outputs")
+    MAX_FILE_SIZE: int = Field(default=500 * 1024 * 1024)  # 500MB
+    CACHE_DIR: str = Field(default="./cache")
+    # Intermediate files that are deleted after each request; tmpfs keeps them in RAM
+    SCRATCH_DIR: str = Field(default="/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+    DIARIZATION_CACHE: bool = Field(default=True)  # Reuse speaker turns for re-uploaded audio
     
     # Database settings
-    DATABASE_URL: str = Field(default="sqlite:///./whisper_diarization.db", env="DATABASE_URL")
+    DATABASE_URL: str = Field(default="sqlite:///./whisper_diarization.db")
     
     # Redis settings
-    REDIS_URL: str = Field(default="redis://localhost:6379", env="REDIS_URL")
+    REDIS_URL: str = Field(default="redis://localhost:6379")
+    USE_REDIS_JOB_STORE: bool = Field(default=False)  # Share batch job state across workers via Redis
     
     # API settings
-    API_KEY_HEADER: str = Field(default="X-API-Key", env="API_KEY_HEADER")
-    API_KEYS: List[str] = Field(default=[], env="API_KEYS")
+    API_KEY_HEADER: str = Field(default="X-API-Key")
+    API_KEYS: List[str] = Field(default=[])
     
     # Logging settings
-    LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
-    LOG_FORMAT: str = Field(default="json", env="LOG_FORMAT")
+    LOG_LEVEL: str = Field(default="INFO")
+    LOG_FORMAT: str = Field(default="json")
     
     # Monitoring settings
-    ENABLE_METRICS: bool = Field(default=True, env="ENABLE_METRICS")
-    METRICS_PORT: int = Field(default=9090, env="METRICS_PORT")
+    ENABLE_METRICS: bool = Field(default=True)
+    METRICS_PORT: int = Field(default=9090)
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
-# Create settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings instance"""
+    return Settings()
 
-# Ensure directories exist
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+# Create settings instance
+settings = get_settings()
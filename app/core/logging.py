@@ -4,51 +4,72 @@ Logging configuration for the Whisper Diarization Service
 
 import logging
 import sys
+import orjson
 import structlog
 from typing import Any, Dict
 
-def setup_logging(log_level: str = "INFO") -> None:
+def _orjson_dumps(obj: Any, **kwargs: Any) -> str:
+    """Serialize a log event with orjson, honouring structlog's fallback handler"""
+    return orjson.dumps(obj, default=kwargs.get("default")).decode()
+
+def setup_logging(log_level: str = "INFO", debug: bool = False) -> None:
     """Setup structured logging configuration"""
     
+    processors = [
+        structlog.stdlib.filter_by_level,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.TimeStamper(fmt="iso"),
+    ]
+    
+    # Walking the stack for every record is only worth it while debugging
+    if debug:
+        processors.append(structlog.processors.StackInfoRenderer())
+    
+    processors.extend([
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+    ])
+    
     # Configure structlog
     structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
-        ],
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
     
-    # Configure standard library logging
+    # Configure standard library logging; structlog already rendered the message
     logging.basicConfig(
         format="%(message)s",
-        stream=sys.stdout,
+        handlers=[logging.StreamHandler(sys.stdout)],
         level=getattr(logging, log_level.upper()),
+        force=True,
     )
     
     # Set specific logger levels
     logging.getLogger("uvicorn").setLevel(logging.INFO)
-    logging.getLogger("uvicorn.access").setLevel(logging.INFO)
+    # Handlers already log each request; keep per-request access lines for debugging only
+    logging.getLogger("uvicorn.access").setLevel(logging.INFO if debug else logging.WARNING)
     logging.getLogger("fastapi").setLevel(logging.INFO)
 
 def get_logger(name: str) -> structlog.BoundLogger:
     """Get a structured logger instance"""
     return structlog.get_logger(name)
 
+# API loggers are resolved once instead of on every request
+_REQUEST_LOGGER = get_logger("api.request")
+_RESPONSE_LOGGER = get_logger("api.response")
+_ERROR_LOGGER = get_logger("api.error")
+
 def log_request(request_id: str, endpoint: str, method: str, **kwargs: Any) -> None:
     """Log API request details"""
-    logger = get_logger("api.request")
-    logger.info(
+    if not _REQUEST_LOGGER.isEnabledFor(logging.INFO):
+        return
+    _REQUEST_LOGGER.info(
         "API request",
         request_id=request_id,
         endpoint=endpoint,
@@ -58,8 +79,9 @@ def log_request(request_id: str, endpoint: str, method: str, **kwargs: Any) -> N
 
 def log_response(request_id: str, status_code: int, response_time: float, **kwargs: Any) -> None:
     """Log API response details"""
-    logger = get_logger("api.response")
-    logger.info(
+    if not _RESPONSE_LOGGER.isEnabledFor(logging.INFO):
+        return
+    _RESPONSE_LOGGER.info(
         "API response",
         request_id=request_id,
         status_code=status_code,
@@ -69,8 +91,9 @@ def log_response(request_id: str, status_code: int, response_time: float, **kwar
 
 def log_error(request_id: str, error: str, **kwargs: Any) -> None:
     """Log error details"""
-    logger = get_logger("api.error")
-    logger.error(
+    if not _ERROR_LOGGER.isEnabledFor(logging.ERROR):
+        return
+    _ERROR_LOGGER.error(
         "API error",
         request_id=request_id,
         error=error,
@@ -6,15 +6,28 @@ A production-ready service for automatic speech recognition with speaker diariza
 import os
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
 from dotenv import load_dotenv
 
 from app.core.config import settings
+
+# Let PyTorch's caching allocator grow segments in place instead of fragmenting
+# between requests; read when CUDA is first used
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,garbage_collection_threshold:0.8")
+
+# Math/memory modes must be set before the services below import the ML libraries
+if settings.ARM_OPTIMIZATIONS:
+    os.environ.setdefault("DNNL_DEFAULT_FPMATH_MODE", "BF16")
+    os.environ.setdefault("THP_MEM_ALLOC_ENABLE", "1")
+    os.environ.setdefault("LRU_CACHE_CAPACITY", "1024")
+    os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count()))
+
+from app.api import routes, parallel_routes
 from app.api.routes import transcription_router
-from app.api.parallel_routes import parallel_router
+from app.api.parallel_routes import parallel_router, MAX_BATCH_FILES
 from app.services.diarization_service import DiarizationService
 from app.services.parallel_diarization_service import ParallelDiarizationService
 from app.core.logging import setup_logging
@@ -23,7 +36,7 @@ from app.core.logging import setup_logging
 load_dotenv()
 
 # Setup logging
-setup_logging(settings.LOG_LEVEL)
+setup_logging(settings.LOG_LEVEL, debug=settings.DEBUG)
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
@@ -32,9 +45,15 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Whisper Diarization Service...")
     
+    # Ensure storage directories exist
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+    
     # Initialize regular diarization service
     app.state.diarization_service = DiarizationService()
     await app.state.diarization_service.initialize()
+    await app.state.diarization_service.warmup()
+    routes._SERVICE = app.state.diarization_service
     logger.info("Regular diarization service initialized successfully")
     
     # Initialize parallel diarization service
@@ -43,6 +62,7 @@ async def lifespan(app: FastAPI):
         use_process_pool=getattr(settings, 'USE_PROCESS_POOL', False)
     )
     await app.state.parallel_diarization_service.initialize()
+    parallel_routes._SERVICE = app.state.parallel_diarization_service
     logger.info("Parallel diarization service initialized successfully")
     
     logger.info("All services initialized successfully")
@@ -52,6 +72,10 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Whisper Diarization Service...")
     
+    # Stop handing services out to new requests
+    routes._SERVICE = None
+    parallel_routes._SERVICE = None
+    
     # Cleanup parallel service
     if hasattr(app.state, 'parallel_diarization_service'):
         await app.state.parallel_diarization_service.cleanup()
@@ -69,7 +93,8 @@ app = FastAPI(
     title="Whisper Diarization Service",
     description="Production-ready service for ASR with speaker diarization and parallel processing",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -81,6 +106,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Batch uploads may carry up to MAX_BATCH_FILES files in a single body
+_BATCH_UPLOAD_PATHS = frozenset({"/api/v1/parallel/batch"})
+
+# Allowance per file for multipart boundaries, part headers and small form fields,
+# which Content-Length counts on top of the file bytes
+_MULTIPART_HEADROOM = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized uploads from the Content-Length header before the body is read"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = next(
+            (value for name, value in scope["headers"] if name == b"content-length"), None
+        )
+        if content_length is not None:
+            files = MAX_BATCH_FILES if scope["path"] in _BATCH_UPLOAD_PATHS else 1
+            limit = settings.MAX_FILE_SIZE * files
+            try:
+                too_large = int(content_length) > limit + _MULTIPART_HEADROOM * files
+            except ValueError:
+                response = ORJSONResponse(status_code=400, content={"detail": "Invalid Content-Length header"})
+                await response(scope, receive, send)
+                return
+            if too_large:
+                response = ORJSONResponse(
+                    status_code=413,
+                    content={"detail": f"Request too large. Maximum size: {limit / (1024*1024):.1f}MB"}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Include routers
 app.include_router(transcription_router, prefix="/api/v1", tags=["transcription"])
 app.include_router(parallel_router, tags=["parallel-processing"])
@@ -100,8 +166,16 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Detailed health check"""
+    # Report unavailable until the model has run its warm-up pass
+    service = getattr(request.app.state, "diarization_service", None)
+    if service is not None and not service.warmed_up:
+        return ORJSONResponse(
+            status_code=503,
+            content={"status": "starting", "service": "whisper-diarization"}
+        )
+    
     return {
         "status": "healthy",
         "service": "whisper-diarization",
@@ -162,5 +236,6 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        loop="uvloop",
         log_level="info"
     )
@@ -4,29 +4,100 @@ Handles concurrent processing with progress tracking and result aggregation
 """
 
 import asyncio
+import time
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
+import numpy as np
+import orjson
 import structlog
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from app.core.config import settings
 from app.models.transcription import BatchTranscriptionRequest, BatchTranscriptionResult, TranscriptionStatus
 from app.services.diarization_service import DiarizationService
+from app.services.job_store import create_job_store
 from app.utils.output_formats import OutputFormatConverter
+from app.utils.batching import (
+    SUPERSEGMENT_DURATION,
+    bucket_by_duration,
+    build_supersegments,
+    probe_duration
+)
 
 logger = structlog.get_logger(__name__)
 
+# Per-file lifecycle events recorded for each batch
+EVENT_STARTED = 0
+EVENT_COMPLETED = 1
+EVENT_FAILED = 2
+
+# Maximum number of events kept across batches; the oldest batches are dropped first
+EVENT_RING_SIZE = 1_000_000
+
+# Per-file status codes stored in BatchState.status
+FILE_PENDING = 0
+FILE_PROCESSING = 1
+FILE_COMPLETED = 2
+FILE_FAILED = 3
+_FILE_STATUS_NAMES = ("pending", "processing", "completed", "failed")
+
+@dataclass
+class BatchState:
+    """Per-file state of a running batch, one column per field indexed by file position"""
+    file_ids: List[str]
+    file_paths: List[str]
+    status: np.ndarray
+    outputs: List[Optional[Dict[str, Any]]]
+    
+    @classmethod
+    def for_files(cls, file_paths: List[str]) -> "BatchState":
+        count = len(file_paths)
+        return cls(
+            file_ids=[str(uuid.uuid4()) for _ in range(count)],
+            file_paths=file_paths,
+            status=np.full(count, FILE_PENDING, dtype=np.int8),
+            outputs=[None] * count
+        )
+    
+    def count(self, status: int) -> int:
+        """Number of files in the given status"""
+        return int(np.count_nonzero(self.status == status))
+    
+    def to_results(self) -> Dict[str, Dict[str, Any]]:
+        """Build the per-file results mapping stored with the job; pending files are omitted"""
+        statuses = self.status.tolist()
+        return {
+            self.file_ids[idx]: {
+                "file_path": self.file_paths[idx],
+                "status": _FILE_STATUS_NAMES[statuses[idx]],
+                **(self.outputs[idx] or {})
+            }
+            for idx in np.flatnonzero(self.status != FILE_PENDING).tolist()
+        }
+
 class BatchProcessor:
     """Handles batch processing of multiple audio files"""
     
     def __init__(self, diarization_service: DiarizationService):
         self.diarization_service = diarization_service
-        self.max_workers = settings.MAX_CONCURRENT_JOBS
+        # Files per model call; concurrency within a batch is left to the model
+        self.batch_size = settings.WHISPER_BATCH_SIZE
+        # Bounds how many batches run at once
+        self._batch_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_GPU_JOBS)
+        self.store = create_job_store()
+        # Jobs being processed by this worker; the store holds the shared copy
         self.active_jobs: Dict[str, Dict[str, Any]] = {}
-        self.completed_jobs: Dict[str, Dict[str, Any]] = {}
-        self.failed_jobs: Dict[str, Dict[str, Any]] = {}
+        # Per-file columns for the jobs in active_jobs
+        self._states: Dict[str, BatchState] = {}
+        # Processing tasks for the batches running in this worker
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Append-only (t_ns, file_id, event) per-file transitions, indexed by batch
+        # in the order batches started
+        self._events: "OrderedDict[str, List[Tuple[int, str, int]]]" = OrderedDict()
+        self._event_count = 0
     
     async def process_batch(self, request: BatchTranscriptionRequest) -> str:
         """Start batch processing and return batch ID"""
@@ -46,9 +117,13 @@ class BatchProcessor:
             "results": {},
             "progress": 0.0
         }
+        self._states[batch_id] = BatchState.for_files([str(file_info["file_path"]) for file_info in request.files])
+        await self.store.save(batch_id, self.active_jobs[batch_id])
         
         # Start processing in background
-        asyncio.create_task(self._process_batch_async(batch_id, request))
+        task = asyncio.create_task(self._process_batch_async(batch_id, request))
+        self._tasks[batch_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(batch_id, None))
         
         return batch_id
     
@@ -60,109 +135,194 @@ class BatchProcessor:
             batch_output_dir = Path(settings.OUTPUT_DIR) / f"batch_{batch_id}"
             batch_output_dir.mkdir(parents=True, exist_ok=True)
             
-            # Process files with limited concurrency
-            semaphore = asyncio.Semaphore(self.max_workers)
-            
-            # Create tasks for each file
-            tasks = []
-            for file_info in request.files:
-                task = asyncio.create_task(
-                    self._process_single_file(batch_id, file_info, batch_output_dir, semaphore)
-                )
-                tasks.append(task)
-            
-            # Wait for all tasks to complete
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # Process files in batches of similar duration
+            async with self._batch_slots:
+                await self._process_batch_grouped(batch_id, request.files, batch_output_dir)
             
             # Finalize batch
             await self._finalize_batch(batch_id, batch_output_dir)
             
+        except asyncio.CancelledError:
+            # cancel_batch already recorded the cancellation
+            self.active_jobs.pop(batch_id, None)
+            self._states.pop(batch_id, None)
+            raise
         except Exception as e:
             logger.error("Batch processing failed", batch_id=batch_id, error=str(e))
-            self.active_jobs[batch_id]["status"] = "failed"
-            self.active_jobs[batch_id]["error"] = str(e)
+            batch_info = self.active_jobs[batch_id]
+            batch_info["status"] = "failed"
+            batch_info["error"] = str(e)
+            await self._finish_job(batch_id, batch_info)
+    
+    async def _finish_job(self, batch_id: str, batch_info: Dict[str, Any]) -> None:
+        """Persist a job that stopped running and drop it from this worker"""
+        
+        batch_info.setdefault("completed_at", datetime.utcnow())
+        self.active_jobs.pop(batch_id, None)
+        self._states.pop(batch_id, None)
+        await self.store.save(batch_id, batch_info)
+        await self.store.mark_finished(batch_id, batch_info["completed_at"])
     
-    async def _process_single_file(self, 
-                                  batch_id: str, 
-                                  file_info: Dict[str, Any], 
-                                  batch_output_dir: Path,
-                                  semaphore: asyncio.Semaphore) -> None:
-        """Process a single file within the batch"""
-        
-        async with semaphore:
-            file_id = str(uuid.uuid4())
-            file_path = Path(file_info["file_path"])
+    async def _process_batch_grouped(self,
+                                     batch_id: str,
+                                     files: List[Dict[str, Any]],
+                                     batch_output_dir: Path) -> None:
+        """Process files in duration buckets, one batched service call per bucket"""
+        
+        state = self._states[batch_id]
+        file_paths = [Path(file_path) for file_path in state.file_paths]
+        durations = await asyncio.to_thread(lambda: [probe_duration(fp) for fp in file_paths])
+        
+        for group in self._group_files(durations):
+            if await self._cancelled(batch_id):
+                return
+            
+            state.status[group] = FILE_PROCESSING
+            started_ns = time.monotonic_ns()
+            logger.info("Processing file group in batch", batch_id=batch_id, file_count=len(group))
+            for index in group:
+                self._record_event(batch_id, started_ns, state.file_ids[index], EVENT_STARTED)
             
             try:
-                logger.info("Processing file in batch", 
-                           batch_id=batch_id, 
-                           file_id=file_id, 
-                           file=str(file_path))
-                
-                # Update progress
-                self.active_jobs[batch_id]["results"][file_id] = {
-                    "file_path": str(file_path),
-                    "status": "processing",
-                    "started_at": datetime.utcnow()
-                }
-                
-                # Process the file
-                result = await self.diarization_service.process_audio(
-                    file_path, 
-                    file_info.get("transcription_request", {})
+                outcomes = await self.diarization_service.process_audio_batch(
+                    [file_paths[index] for index in group],
+                    [files[index].get("transcription_request", {}) for index in group]
                 )
-                
-                # Save results in multiple formats
-                file_output_dir = batch_output_dir / file_path.stem
-                saved_files = OutputFormatConverter.save_all_formats(
-                    result, 
-                    file_output_dir, 
-                    file_path.stem,
-                    include_speakers=True
-                )
-                
-                # Update file result
-                self.active_jobs[batch_id]["results"][file_id].update({
-                    "status": "completed",
-                    "completed_at": datetime.utcnow(),
-                    "result": result,
-                    "output_files": {k: str(v) for k, v in saved_files.items()}
-                })
-                
-                # Update batch progress
-                self.active_jobs[batch_id]["completed_files"] += 1
-                self.active_jobs[batch_id]["progress"] = (
-                    self.active_jobs[batch_id]["completed_files"] / 
-                    self.active_jobs[batch_id]["total_files"]
-                )
-                
-                logger.info("File completed in batch", 
-                           batch_id=batch_id, 
-                           file_id=file_id, 
-                           file=str(file_path))
-                
             except Exception as e:
-                logger.error("File processing failed in batch", 
-                           batch_id=batch_id, 
-                           file_id=file_id, 
-                           file=str(file_path), 
-                           error=str(e))
-                
-                # Update file result with error
-                self.active_jobs[batch_id]["results"][file_id].update({
-                    "status": "failed",
-                    "completed_at": datetime.utcnow(),
-                    "error": str(e)
-                })
-                
-                # Update batch progress
-                self.active_jobs[batch_id]["failed_files"] += 1
+                outcomes = [e] * len(group)
+            
+            finished_ns = time.monotonic_ns()
+            for index, outcome in zip(group, outcomes):
+                if isinstance(outcome, Exception):
+                    self._record_file_failure(batch_id, index, file_paths[index], outcome, finished_ns)
+                    continue
+                try:
+                    outputs = await asyncio.to_thread(self._write_file_outputs, file_paths[index], outcome, batch_output_dir)
+                    self._record_file_result(batch_id, index, file_paths[index], outputs, finished_ns)
+                except Exception as e:
+                    self._record_file_failure(batch_id, index, file_paths[index], e, finished_ns)
+            
+            self._sync_progress(batch_id)
+            if await self._cancelled(batch_id):
+                return
+            await self.store.save(batch_id, self.active_jobs[batch_id])
+    
+    async def _cancelled(self, batch_id: str) -> bool:
+        """
+        Check whether a running batch was cancelled, by this worker or another
+        
+        A cancel handled by another worker only reaches the store, so the
+        status is re-read from there before this worker's copy is saved over it.
+        """
+        batch_info = self.active_jobs[batch_id]
+        if batch_info["status"] != "cancelled" and await self.store.get_status(batch_id) == "cancelled":
+            batch_info["status"] = "cancelled"
+        return batch_info["status"] == "cancelled"
+    
+    def _sync_progress(self, batch_id: str) -> None:
+        """Copy counters and per-file results from the batch columns into the job"""
+        
+        state = self._states[batch_id]
+        batch_info = self.active_jobs[batch_id]
+        batch_info["completed_files"] = state.count(FILE_COMPLETED)
+        batch_info["failed_files"] = state.count(FILE_FAILED)
+        batch_info["progress"] = batch_info["completed_files"] / batch_info["total_files"]
+        batch_info["results"] = state.to_results()
+    
+    def _group_files(self, durations: List[float]) -> List[List[int]]:
+        """Pack short files into super-segments and bucket the rest by duration"""
+        
+        short = [i for i, d in enumerate(durations) if d < SUPERSEGMENT_DURATION]
+        long = [i for i, d in enumerate(durations) if d >= SUPERSEGMENT_DURATION]
+        
+        groups = [
+            [short[j] for j in segment]
+            for segment in build_supersegments([durations[i] for i in short])
+        ]
+        groups.extend(
+            [long[j] for j in batch]
+            for batch in bucket_by_duration([durations[i] for i in long], max_batch_size=self.batch_size)
+        )
+        return groups
+    
+    def _write_file_outputs(self, file_path: Path, result: Any, batch_output_dir: Path) -> Dict[str, Any]:
+        """Save a file's result to disk in every output format (blocking)"""
+        
+        if hasattr(result, "model_dump"):
+            result = result.model_dump()
+        
+        # Stream segments to JSON Lines; only the path is kept in the job state
+        file_output_dir = batch_output_dir / file_path.stem
+        result_path = file_output_dir / f"{file_path.stem}.jsonl"
+        segment_count = OutputFormatConverter.write_jsonl(result.get("segments", []), result_path)
+        
+        # Save results in multiple formats
+        saved_files = OutputFormatConverter.save_all_formats(
+            result, 
+            file_output_dir, 
+            file_path.stem,
+            include_speakers=True
+        )
+        
+        return {
+            "result_path": str(result_path),
+            "segment_count": segment_count,
+            "output_files": {k: str(v) for k, v in saved_files.items()}
+        }
+    
+    def _record_file_result(self,
+                            batch_id: str,
+                            index: int,
+                            file_path: Path,
+                            outputs: Dict[str, Any],
+                            finished_ns: int) -> None:
+        """Mark a file completed with the outputs written for it"""
+        
+        # Update file result
+        state = self._states[batch_id]
+        state.status[index] = FILE_COMPLETED
+        state.outputs[index] = outputs
+        
+        file_id = state.file_ids[index]
+        self._record_event(batch_id, finished_ns, file_id, EVENT_COMPLETED)
+        
+        logger.info("File completed in batch", 
+                   batch_id=batch_id, 
+                   file_id=file_id, 
+                   file=str(file_path))
+    
+    def _record_file_failure(self,
+                             batch_id: str,
+                             index: int,
+                             file_path: Path,
+                             error: Exception,
+                             finished_ns: int) -> None:
+        """Mark a file in the batch as failed"""
+        
+        state = self._states[batch_id]
+        file_id = state.file_ids[index]
+        logger.error("File processing failed in batch", 
+                   batch_id=batch_id, 
+                   file_id=file_id, 
+                   file=str(file_path), 
+                   error=str(error))
+        
+        # Update file result with error
+        state.status[index] = FILE_FAILED
+        state.outputs[index] = {"error": str(error)}
+        self._record_event(batch_id, finished_ns, file_id, EVENT_FAILED)
     
     async def _finalize_batch(self, batch_id: str, batch_output_dir: Path):
         """Finalize batch processing and generate summary"""
         
+        batch_info = self.active_jobs[batch_id]
+        if await self._cancelled(batch_id):
+            self.active_jobs.pop(batch_id, None)
+            self._states.pop(batch_id, None)
+            return
+        
         try:
-            batch_info = self.active_jobs[batch_id]
+            completed_at = datetime.utcnow()
             
             # Create batch summary
             summary = {
@@ -172,15 +332,16 @@ class BatchProcessor:
                 "failed_files": batch_info["failed_files"],
                 "success_rate": batch_info["completed_files"] / batch_info["total_files"],
                 "started_at": batch_info["started_at"],
-                "completed_at": datetime.utcnow(),
+                "completed_at": completed_at,
                 "output_directory": str(batch_output_dir)
             }
             
             # Save batch summary
             summary_path = batch_output_dir / "batch_summary.json"
-            import json
-            with open(summary_path, 'w') as f:
-                json.dump(summary, f, indent=2, default=str)
+            summary_bytes = orjson.dumps(
+                summary, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str
+            )
+            await asyncio.to_thread(summary_path.write_bytes, summary_bytes)
             
             # Update batch status
             if batch_info["failed_files"] == 0:
@@ -189,10 +350,7 @@ class BatchProcessor:
                 batch_info["status"] = "completed_with_errors"
             
             batch_info["summary"] = summary
-            
-            # Move to completed jobs
-            self.completed_jobs[batch_id] = batch_info
-            del self.active_jobs[batch_id]
+            batch_info["completed_at"] = completed_at
             
             logger.info("Batch processing completed", 
                        batch_id=batch_id, 
@@ -200,95 +358,101 @@ class BatchProcessor:
             
         except Exception as e:
             logger.error("Failed to finalize batch", batch_id=batch_id, error=str(e))
-            self.active_jobs[batch_id]["status"] = "failed"
+            batch_info["status"] = "failed"
+        
+        await self._finish_job(batch_id, batch_info)
     
-    def get_batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+    async def get_batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
         """Get status of a batch job"""
+        batch_info = await self.store.get(batch_id)
+        if batch_info is None:
+            return None
         
-        # Check active jobs
-        if batch_id in self.active_jobs:
-            return self.active_jobs[batch_id]
+        # Per-file timings are only known to the worker that processed the batch
+        timings = self._file_timings(batch_id)
+        if timings:
+            batch_info = {**batch_info, "file_timings": timings}
+        return batch_info
+    
+    def _record_event(self, batch_id: str, t_ns: int, file_id: str, event: int) -> None:
+        """Append a per-file transition, dropping the oldest batches past EVENT_RING_SIZE"""
         
-        # Check completed jobs
-        if batch_id in self.completed_jobs:
-            return self.completed_jobs[batch_id]
+        self._events.setdefault(batch_id, []).append((t_ns, file_id, event))
+        self._event_count += 1
+        while self._event_count > EVENT_RING_SIZE and len(self._events) > 1:
+            _, dropped = self._events.popitem(last=False)
+            self._event_count -= len(dropped)
+    
+    def _file_timings(self, batch_id: str) -> Dict[str, Dict[str, float]]:
+        """Derive per-file processing times for a batch from its recorded events"""
         
-        # Check failed jobs
-        if batch_id in self.failed_jobs:
-            return self.failed_jobs[batch_id]
+        now_ns = time.monotonic_ns()
+        started: Dict[str, int] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        for t_ns, file_id, event in self._events.get(batch_id, ()):
+            if event == EVENT_STARTED:
+                started[file_id] = t_ns
+            elif file_id in started:
+                timings[file_id] = {"elapsed_seconds": (t_ns - started.pop(file_id)) / 1e9}
         
-        return None
+        # Files still being processed report time elapsed so far
+        for file_id, t_ns in started.items():
+            timings[file_id] = {"elapsed_seconds": (now_ns - t_ns) / 1e9}
+        return timings
     
-    def get_all_batches(self) -> Dict[str, Dict[str, Any]]:
+    async def get_all_batches(self) -> Dict[str, Dict[str, Any]]:
         """Get all batch jobs"""
-        all_batches = {}
-        all_batches.update(self.active_jobs)
-        all_batches.update(self.completed_jobs)
-        all_batches.update(self.failed_jobs)
-        return all_batches
+        return await self.store.all()
     
-    def cancel_batch(self, batch_id: str) -> bool:
+    async def cancel_batch(self, batch_id: str) -> bool:
         """Cancel a running batch job"""
         
-        if batch_id not in self.active_jobs:
+        batch_info = self.active_jobs.get(batch_id) or await self.store.get(batch_id)
+        if batch_info is None or batch_info["status"] != "processing":
             return False
         
-        batch_info = self.active_jobs[batch_id]
         batch_info["status"] = "cancelled"
         batch_info["cancelled_at"] = datetime.utcnow()
+        batch_info["completed_at"] = batch_info["cancelled_at"]
+        
+        await self.store.save(batch_id, batch_info)
+        await self.store.mark_finished(batch_id, batch_info["completed_at"])
         
-        # Move to failed jobs
-        self.failed_jobs[batch_id] = batch_info
-        del self.active_jobs[batch_id]
+        # Stop in-flight work; cancellation propagates through the service's task group
+        task = self._tasks.get(batch_id)
+        if task is not None:
+            task.cancel()
         
         logger.info("Batch cancelled", batch_id=batch_id)
         return True
     
-    def cleanup_old_jobs(self, max_age_hours: int = 24):
+    async def cleanup_old_jobs(self, max_age_hours: int = 24):
         """Clean up old completed/failed jobs"""
         
         cutoff_time = datetime.utcnow().timestamp() - (max_age_hours * 3600)
+        removed = await self.store.remove_finished_before(cutoff_time)
         
-        # Clean up completed jobs
-        jobs_to_remove = []
-        for batch_id, job_info in self.completed_jobs.items():
-            if job_info["completed_at"].timestamp() < cutoff_time:
-                jobs_to_remove.append(batch_id)
-        
-        for batch_id in jobs_to_remove:
-            del self.completed_jobs[batch_id]
-        
-        # Clean up failed jobs
-        jobs_to_remove = []
-        for batch_id, job_info in self.failed_jobs.items():
-            if job_info.get("completed_at", job_info["started_at"]).timestamp() < cutoff_time:
-                jobs_to_remove.append(batch_id)
-        
-        for batch_id in jobs_to_remove:
-            del self.failed_jobs[batch_id]
-        
-        if jobs_to_remove:
-            logger.info(f"Cleaned up {len(jobs_to_remove)} old jobs")
+        if removed:
+            logger.info("Cleaned up old jobs", removed=removed)
     
-    def get_statistics(self) -> Dict[str, Any]:
+    async def get_statistics(self) -> Dict[str, Any]:
         """Get batch processing statistics"""
         
-        total_active = len(self.active_jobs)
-        total_completed = len(self.completed_jobs)
-        total_failed = len(self.failed_jobs)
+        jobs = (await self.store.all()).values()
+        total_active = sum(1 for job in jobs if job["status"] == "processing")
+        completed = [job for job in jobs if job["status"] in ("completed", "completed_with_errors")]
+        total_completed = len(completed)
+        total_failed = len(jobs) - total_active - total_completed
         
         # Calculate success rate
         total_processed = total_completed + total_failed
         success_rate = total_completed / total_processed if total_processed > 0 else 0
         
         # Calculate average processing time
-        processing_times = []
-        for job_info in self.completed_jobs.values():
-            if "started_at" in job_info and "completed_at" in job_info:
-                duration = (job_info["completed_at"] - job_info["started_at"]).total_seconds()
-                processing_times.append(duration)
-        
-        avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0
+        timed = [job_info for job_info in completed if "started_at" in job_info and "completed_at" in job_info]
+        started = np.fromiter((job_info["started_at"].timestamp() for job_info in timed), np.float64, len(timed))
+        finished = np.fromiter((job_info["completed_at"].timestamp() for job_info in timed), np.float64, len(timed))
+        avg_processing_time = float((finished - started).mean()) if timed else 0
         
         return {
             "active_jobs": total_active,
@@ -297,5 +461,6 @@ class BatchProcessor:
             "total_processed": total_processed,
             "success_rate": success_rate,
             "average_processing_time": avg_processing_time,
-            "max_concurrent_jobs": self.max_workers
+            "batch_size": self.batch_size,
+            "seconds_skipped_by_vad": round(self.diarization_service.vad_skipped_seconds, 3)
         }
@@ -0,0 +1,158 @@
+"""
+Job state storage for batch processing
+Keeps batch jobs in process memory or in Redis so several workers can share them
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# msgpack extension code used for datetime values
+_DATETIME_EXT = 1
+
+class InMemoryJobStore:
+    """Job store backed by a dict in the current process"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Finish timestamps kept sorted, with job IDs in the same order
+        self._finished_ts = np.empty(0, dtype=np.float64)
+        self._finished_ids: List[str] = []
+
+    async def save(self, batch_id: str, job: Dict[str, Any]) -> None:
+        """Create or replace a job"""
+        self._jobs[batch_id] = job
+
+    async def get(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        return self._jobs.get(batch_id)
+
+    async def get_status(self, batch_id: str) -> Optional[str]:
+        """Get only a job's status"""
+        job = self._jobs.get(batch_id)
+        return None if job is None else job.get("status")
+
+    async def all(self) -> Dict[str, Dict[str, Any]]:
+        """Get all jobs keyed by ID"""
+        return dict(self._jobs)
+
+    async def mark_finished(self, batch_id: str, finished_at: datetime) -> None:
+        """Record when a job stopped running, for age-based cleanup"""
+        ts = finished_at.timestamp()
+        # Jobs finish in roughly chronological order, so this is almost always an append
+        index = int(np.searchsorted(self._finished_ts, ts, side='right'))
+        self._finished_ts = np.insert(self._finished_ts, index, ts)
+        self._finished_ids.insert(index, batch_id)
+
+    async def remove_finished_before(self, cutoff: float) -> int:
+        """Delete jobs that finished before the `cutoff` timestamp"""
+        index = int(np.searchsorted(self._finished_ts, cutoff, side='left'))
+        if not index:
+            return 0
+        for batch_id in self._finished_ids[:index]:
+            self._jobs.pop(batch_id, None)
+        self._finished_ts = self._finished_ts[index:]
+        del self._finished_ids[:index]
+        return index
+
+    async def close(self) -> None:
+        """Release resources held by the store"""
+
+class RedisJobStore:
+    """
+    Job store backed by Redis
+
+    Each job is a hash keyed by batch ID with msgpack-encoded fields; a sorted
+    set indexed by finish time makes age-based cleanup a range query.
+    """
+
+    def __init__(self, url: str = settings.REDIS_URL, prefix: str = "batch"):
+        import msgpack
+        import redis.asyncio as redis
+
+        self._msgpack = msgpack
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._finished_key = f"{prefix}:finished"
+
+    def _job_key(self, batch_id: str) -> str:
+        return f"{self._prefix}:job:{batch_id}"
+
+    def _pack(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, default=self._encode_ext)
+
+    def _unpack(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, ext_hook=self._decode_ext, strict_map_key=False)
+
+    def _encode_ext(self, obj: Any) -> Any:
+        if isinstance(obj, datetime):
+            return self._msgpack.ExtType(_DATETIME_EXT, obj.isoformat().encode())
+        if hasattr(obj, "model_dump"):
+            return obj.model_dump()
+        raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+    def _decode_ext(self, code: int, data: bytes) -> Any:
+        if code == _DATETIME_EXT:
+            return datetime.fromisoformat(data.decode())
+        return self._msgpack.ExtType(code, data)
+
+    async def save(self, batch_id: str, job: Dict[str, Any]) -> None:
+        """Create or replace a job"""
+        await self._redis.hset(
+            self._job_key(batch_id),
+            mapping={field: self._pack(value) for field, value in job.items()}
+        )
+
+    async def get(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        fields = await self._redis.hgetall(self._job_key(batch_id))
+        if not fields:
+            return None
+        return {field.decode(): self._unpack(value) for field, value in fields.items()}
+
+    async def get_status(self, batch_id: str) -> Optional[str]:
+        """Get only a job's status, without decoding its other fields"""
+        value = await self._redis.hget(self._job_key(batch_id), "status")
+        return None if value is None else self._unpack(value)
+
+    async def all(self) -> Dict[str, Dict[str, Any]]:
+        """Get all jobs keyed by ID"""
+        jobs = {}
+        prefix_len = len(self._job_key(""))
+        async for key in self._redis.scan_iter(match=self._job_key("*")):
+            batch_id = key.decode()[prefix_len:]
+            job = await self.get(batch_id)
+            if job is not None:
+                jobs[batch_id] = job
+        return jobs
+
+    async def mark_finished(self, batch_id: str, finished_at: datetime) -> None:
+        """Record when a job stopped running, for age-based cleanup"""
+        await self._redis.zadd(self._finished_key, {batch_id: finished_at.timestamp()})
+
+    async def remove_finished_before(self, cutoff: float) -> int:
+        """Delete jobs that finished before the `cutoff` timestamp"""
+        expired: List[bytes] = await self._redis.zrangebyscore(self._finished_key, "-inf", f"({cutoff}")
+        if not expired:
+            return 0
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*[self._job_key(batch_id.decode()) for batch_id in expired])
+            pipe.zremrangebyscore(self._finished_key, "-inf", f"({cutoff}")
+            await pipe.execute()
+        return len(expired)
+
+    async def close(self) -> None:
+        """Release resources held by the store"""
+        await self._redis.close()
+
+def create_job_store():
+    """Build the job store selected by USE_REDIS_JOB_STORE"""
+    if settings.USE_REDIS_JOB_STORE:
+        logger.info("Using Redis job store", url=settings.REDIS_URL)
+        return RedisJobStore()
+    return InMemoryJobStore()
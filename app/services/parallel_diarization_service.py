@@ -5,6 +5,7 @@ for maximum performance and efficiency.
 """
 
 import asyncio
+import copy
 import os
 import tempfile
 import uuid
@@ -17,6 +18,14 @@ import structlog
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import threading
 from dataclasses import dataclass
+from functools import lru_cache
+import yaml
+
+# libyaml's C parser is several times faster; PyYAML builds without it fall back to Python
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 # Heavy ML imports commented out for Python 3.13 compatibility
 # import torch
@@ -28,10 +37,17 @@ from dataclasses import dataclass
 # from nemo.collections.asr.models import ClusteringDiarizer
 
 from app.core.config import settings
+from app.utils.speaker_alignment import SpeakerSegmentArray
 from app.models.transcription import TranscriptionRequest, TranscriptionResult, SpeakerSegment, TranscriptionSegment
 
 logger = structlog.get_logger(__name__)
 
+@lru_cache(maxsize=8)
+def _parse_config(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a YAML config; the mtime in the cache key picks up edits to the file"""
+    with open(config_path) as f:
+        return yaml.load(f, Loader=YamlLoader)
+
 @dataclass
 class ProcessingTask:
     """Represents a processing task with its metadata"""
@@ -83,6 +99,7 @@ class ParallelDiarizationService:
         }
         
         # Configuration
+        self._base_config: Optional[Dict[str, Any]] = None  # Parsed diarization YAML, loaded once
         self.device = "cpu"  # Simplified for testing
         self.parallel_processing = True
         self.gpu_memory_optimization = True
@@ -111,20 +128,22 @@ class ParallelDiarizationService:
             
         except Exception as e:
             self.initialization_error = str(e)
-            logger.error(f"Failed to initialize ParallelDiarizationService: {e}")
+            logger.error("Failed to initialize ParallelDiarizationService", error=str(e))
             raise
 
     async def _load_config(self, config_path: str):
         """Load configuration from file"""
         try:
-            logger.info(f"Loading configuration from: {config_path}")
-            # This would load the actual NeMo MSDD config
-            # For now, just log the path
-            pass
+            logger.info("Loading configuration", path=str(config_path))
+            self._base_config = _parse_config(config_path, os.stat(config_path).st_mtime_ns)
         except Exception as e:
-            logger.error(f"Failed to load configuration: {e}")
+            logger.error("Failed to load configuration", error=str(e))
             raise
 
+    def diarization_config(self) -> Dict[str, Any]:
+        """Return a per-request copy of the loaded diarization config"""
+        return copy.deepcopy(self._base_config) if self._base_config is not None else {}
+
     async def _initialize_models(self):
         """Initialize Whisper and NeMo models"""
         try:
@@ -138,19 +157,19 @@ class ParallelDiarizationService:
             # )
             
             # Initialize NeMo diarization pipeline
-            # config = self._load_diarization_config()
+            # config = self.diarization_config()
             # self.diarization_pipeline = NeuralDiarizer(cfg=config, trainer=None)
             
             logger.info("ML models initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize ML models: {e}")
+            logger.error("Failed to initialize ML models", error=str(e))
             raise
 
     async def _initialize_pools(self):
         """Initialize processing pools"""
         try:
-            logger.info(f"Initializing processing pools with {self.max_workers} workers")
+            logger.info("Initializing processing pools", workers=self.max_workers)
             
             # Test pool functionality
             test_future = self.thread_pool.submit(lambda: "test")
@@ -163,7 +182,7 @@ class ParallelDiarizationService:
             logger.info("Processing pools initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize processing pools: {e}")
+            logger.error("Failed to initialize processing pools", error=str(e))
             raise
 
     async def process_audio_parallel(
@@ -199,7 +218,7 @@ class ParallelDiarizationService:
                 self.active_tasks[task.task_id] = task
                 self.processing_stats["total_tasks"] += 1
             
-            logger.info(f"Starting parallel processing for task {task.task_id}")
+            logger.info("Starting parallel processing", task_id=task.task_id)
             
             try:
                 # Run Whisper and NeMo in parallel
@@ -225,7 +244,7 @@ class ParallelDiarizationService:
                 processing_time = task.end_time - task.start_time
                 self._update_stats(processing_time, success=True)
                 
-                logger.info(f"Parallel processing completed for task {task.task_id} in {processing_time:.2f}s")
+                logger.info("Parallel processing completed", task_id=task.task_id, processing_time=round(processing_time, 2))
                 return result
                 
             except Exception as e:
@@ -236,7 +255,7 @@ class ParallelDiarizationService:
                 processing_time = task.end_time - task.start_time
                 self._update_stats(processing_time, success=False)
                 
-                logger.error(f"Parallel processing failed for task {task.task_id}: {e}")
+                logger.error("Parallel processing failed", task_id=task.task_id, error=str(e))
                 raise
                 
             finally:
@@ -246,7 +265,7 @@ class ParallelDiarizationService:
                         del self.active_tasks[task.task_id]
                 
         except Exception as e:
-            logger.error(f"Failed to process audio: {e}")
+            logger.error("Failed to process audio", error=str(e))
             raise
 
     async def _run_parallel_processing(self, task: ProcessingTask) -> Tuple[asyncio.Future, asyncio.Future]:
@@ -257,7 +276,7 @@ class ParallelDiarizationService:
             Tuple of (whisper_future, diarization_future)
         """
         try:
-            logger.info(f"Starting parallel processing for task {task.task_id}")
+            logger.info("Starting parallel processing", task_id=task.task_id)
             
             # Submit Whisper processing to thread pool
             whisper_future = asyncio.wrap_future(
@@ -280,13 +299,13 @@ class ParallelDiarizationService:
             return whisper_future, diarization_future
             
         except Exception as e:
-            logger.error(f"Failed to start parallel processing: {e}")
+            logger.error("Failed to start parallel processing", error=str(e))
             raise
 
     def _process_whisper(self, audio_file: Path, request: TranscriptionRequest) -> Dict:
         """Process audio with Whisper (runs in thread pool)"""
         try:
-            logger.info(f"Processing Whisper for {audio_file}")
+            logger.info("Processing Whisper", file=str(audio_file))
             
             # This would run actual Whisper processing
             # For now, return mock result
@@ -307,17 +326,17 @@ class ParallelDiarizationService:
             # Simulate processing time
             time.sleep(2)
             
-            logger.info(f"Whisper processing completed for {audio_file}")
+            logger.info("Whisper processing completed", file=str(audio_file))
             return mock_result
             
         except Exception as e:
-            logger.error(f"Whisper processing failed: {e}")
+            logger.error("Whisper processing failed", error=str(e))
             raise
 
     def _process_diarization(self, audio_file: Path, request: TranscriptionRequest) -> List[SpeakerSegment]:
         """Process audio with NeMo diarization (runs in thread pool)"""
         try:
-            logger.info(f"Processing NeMo diarization for {audio_file}")
+            logger.info("Processing NeMo diarization", file=str(audio_file))
             
             # This would run actual NeMo diarization
             # For now, return mock result
@@ -339,11 +358,11 @@ class ParallelDiarizationService:
             # Simulate processing time
             time.sleep(3)
             
-            logger.info(f"NeMo diarization completed for {audio_file}")
+            logger.info("NeMo diarization completed", file=str(audio_file))
             return mock_speakers
             
         except Exception as e:
-            logger.error(f"NeMo diarization failed: {e}")
+            logger.error("NeMo diarization failed", error=str(e))
             raise
 
     async def _combine_results(
@@ -354,26 +373,27 @@ class ParallelDiarizationService:
     ) -> TranscriptionResult:
         """Combine Whisper and NeMo results into final transcription"""
         try:
-            logger.info(f"Combining results for task {task.task_id}")
+            logger.info("Combining results", task_id=task.task_id)
             
             # This would implement the actual result combination logic
             # For now, create a mock combined result
             
-            segments = []
-            for i, segment in enumerate(whisper_result.get("segments", [])):
-                # Find best matching speaker for this segment
-                speaker = self._find_best_speaker_for_segment(segment, diarization_result)
-                
-                segments.append(
-                    TranscriptionSegment(
-                        id=i + 1,
-                        start=segment["start"],
-                        end=segment["end"],
-                        text=segment["text"],
-                        speaker=speaker or "Unknown",
-                        confidence=segment.get("confidence", 0.0)
-                    )
-                )
+            whisper_segments = whisper_result.get("segments", [])
+            
+            # Pull each field out in its own pass instead of per-segment lookups
+            starts = [segment["start"] for segment in whisper_segments]
+            ends = [segment["end"] for segment in whisper_segments]
+            texts = [segment["text"] for segment in whisper_segments]
+            confidences = [segment.get("confidence", 0.0) for segment in whisper_segments]
+            
+            speakers = self._assign_speakers_vectorized(starts, ends, diarization_result)
+            
+            construct = TranscriptionSegment.model_construct
+            segments = [
+                construct(id=i, start=start, end=end, text=text, speaker=speaker, confidence=confidence)
+                for i, (start, end, text, speaker, confidence)
+                in enumerate(zip(starts, ends, texts, speakers, confidences), start=1)
+            ]
             
             result = TranscriptionResult(
                 transcription_id=task.task_id,
@@ -388,42 +408,24 @@ class ParallelDiarizationService:
                 diarization_model="mock"
             )
             
-            logger.info(f"Results combined successfully for task {task.task_id}")
+            logger.info("Results combined successfully", task_id=task.task_id)
             return result
             
         except Exception as e:
-            logger.error(f"Failed to combine results: {e}")
+            logger.error("Failed to combine results", error=str(e))
             raise
 
-    def _find_best_speaker_for_segment(
-        self, 
-        segment: Dict, 
+    def _assign_speakers_vectorized(
+        self,
+        starts: List[float],
+        ends: List[float],
         speaker_segments: List[SpeakerSegment]
-    ) -> Optional[str]:
-        """Find the best matching speaker for a transcription segment"""
-        try:
-            segment_start = segment["start"]
-            segment_end = segment["end"]
-            
-            best_speaker = None
-            best_overlap = 0.0
-            
-            for speaker_seg in speaker_segments:
-                # Calculate overlap
-                overlap_start = max(segment_start, speaker_seg.start_time)
-                overlap_end = min(segment_end, speaker_seg.end_time)
-                
-                if overlap_end > overlap_start:
-                    overlap = overlap_end - overlap_start
-                    if overlap > best_overlap:
-                        best_overlap = overlap
-                        best_speaker = speaker_seg.speaker_id
-            
-            return best_speaker
-            
-        except Exception as e:
-            logger.error(f"Speaker matching failed: {e}")
-            return None
+    ) -> List[str]:
+        """Label of the most-overlapping speaker turn for every segment, in one kernel call"""
+        if not speaker_segments:
+            return ["Unknown"] * len(starts)
+        speakers = SpeakerSegmentArray.from_segments(speaker_segments).assign(starts, ends)
+        return [speaker or "Unknown" for speaker in speakers]
 
     def _update_stats(self, processing_time: float, success: bool):
         """Update processing statistics"""
@@ -441,7 +443,7 @@ class ParallelDiarizationService:
                 )
                 
         except Exception as e:
-            logger.error(f"Failed to update stats: {e}")
+            logger.error("Failed to update stats", error=str(e))
 
     def get_task_status(self, task_id: str) -> Optional[Dict]:
         """Get status of a specific task"""
@@ -460,7 +462,7 @@ class ParallelDiarizationService:
                 return None
                 
         except Exception as e:
-            logger.error(f"Failed to get task status: {e}")
+            logger.error("Failed to get task status", error=str(e))
             return None
 
     def _calculate_progress(self, task: ProcessingTask) -> float:
@@ -481,7 +483,7 @@ class ParallelDiarizationService:
                 return 0.0
                 
         except Exception as e:
-            logger.error(f"Failed to calculate progress: {e}")
+            logger.error("Failed to calculate progress", error=str(e))
             return 0.0
 
     def get_processing_stats(self) -> Dict[str, Any]:
@@ -491,7 +493,7 @@ class ParallelDiarizationService:
                 return self.processing_stats.copy()
                 
         except Exception as e:
-            logger.error(f"Failed to get processing stats: {e}")
+            logger.error("Failed to get processing stats", error=str(e))
             return {}
 
     def get_active_tasks(self) -> List[Dict]:
@@ -510,7 +512,7 @@ class ParallelDiarizationService:
                 ]
                 
         except Exception as e:
-            logger.error(f"Failed to get active tasks: {e}")
+            logger.error("Failed to get active tasks", error=str(e))
             return []
 
     async def cleanup(self):
@@ -541,7 +543,7 @@ class ParallelDiarizationService:
             logger.info("ParallelDiarizationService cleanup completed")
             
         except Exception as e:
-            logger.error(f"Cleanup failed: {e}")
+            logger.error("Cleanup failed", error=str(e))
 
     def get_supported_features(self) -> Dict[str, Any]:
         """Get information about supported features"""
@@ -0,0 +1,41 @@
+"""
+Compiled speaker assignment kernel
+Uses Numba when installed and falls back to the same code as plain Python
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function uncompiled"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+@njit(parallel=True, cache=True)
+def assign_speakers(trans_start, trans_end, spk_start, spk_end, spk_end_max):
+    """
+    Index of the speaker turn overlapping each transcription segment the most
+
+    Speaker arrays must be sorted by start with `spk_end_max` the running
+    maximum of `spk_end`; segments without any overlap get -1.
+    """
+    best = np.full(trans_start.shape[0], -1, dtype=np.int64)
+    for t in prange(trans_start.shape[0]):
+        seg_start = trans_start[t]
+        seg_end = trans_end[t]
+        lo = np.searchsorted(spk_end_max, seg_start, side="right")
+        hi = np.searchsorted(spk_start, seg_end, side="left")
+        best_overlap = 0.0
+        for s in range(lo, hi):
+            overlap = min(seg_end, spk_end[s]) - max(seg_start, spk_start[s])
+            if overlap > best_overlap:
+                best_overlap = overlap
+                best[t] = s
+    return best
@@ -3,7 +3,6 @@ Audio processing utilities for the diarization service
 """
 
 import asyncio
-import tempfile
 from pathlib import Path
 from typing import Optional, Tuple
 import structlog
@@ -13,6 +12,8 @@ import soundfile as sf
 from pydub import AudioSegment
 from pydub.effects import normalize
 
+from app.core.config import settings
+
 logger = structlog.get_logger(__name__)
 
 class AudioProcessor:
@@ -25,8 +26,13 @@ class AudioProcessor:
         self, 
         audio_file: Path, 
         transcription_id: str
-    ) -> Path:
-        """Preprocess audio file for optimal transcription"""
+    ) -> Tuple[Path, bool]:
+        """
+        Preprocess audio file for optimal transcription
+        
+        Returns the path to transcribe and whether it is a new temporary file
+        that the caller should delete when done.
+        """
         
         try:
             logger.info("Preprocessing audio file", file=str(audio_file))
@@ -34,7 +40,7 @@ class AudioProcessor:
             # Check if preprocessing is needed
             if not self._needs_preprocessing(audio_file):
                 logger.info("No preprocessing needed", file=str(audio_file))
-                return audio_file
+                return audio_file, False
             
             # Load audio
             audio = await self._load_audio(audio_file)
@@ -53,7 +59,7 @@ class AudioProcessor:
                        input_file=str(audio_file),
                        output_file=str(output_path))
             
-            return output_path
+            return output_path, True
             
         except Exception as e:
             logger.error("Failed to preprocess audio", error=str(e), file=str(audio_file))
@@ -114,11 +120,11 @@ class AudioProcessor:
         original_file: Path, 
         transcription_id: str
     ) -> Path:
-        """Save processed audio to temporary file"""
+        """Save processed audio to the scratch directory"""
         
         try:
-            # Create temporary file
-            temp_dir = Path(tempfile.gettempdir())
+            # Scratch lives on tmpfs where available, so the WAV never touches disk
+            temp_dir = Path(settings.SCRATCH_DIR)
             output_filename = f"{transcription_id}_processed.wav"
             output_path = temp_dir / output_filename
             
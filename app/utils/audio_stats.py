@@ -0,0 +1,36 @@
+"""
+Time-domain audio statistics
+With Numba, one compiled pass over the waveform instead of one NumPy pass (and temporary) per statistic
+"""
+
+import math
+
+import numpy as np
+
+from app.utils.align_numba import NUMBA_AVAILABLE, njit, prange
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _audio_stats_kernel(y):
+    n = y.shape[0]
+    if n == 0:
+        return 0.0, 0
+    sum_sq = 0.0
+    zero_crossings = 0
+    for i in prange(n):
+        sample = y[i]
+        sum_sq += sample * sample
+        if i > 0 and (y[i - 1] < 0) != (sample < 0):
+            zero_crossings += 1
+    return math.sqrt(sum_sq / n), zero_crossings
+
+def _audio_stats_numpy(y):
+    if len(y) == 0:
+        return 0.0, 0
+    return float(np.sqrt(np.mean(y * y))), int(np.count_nonzero(np.diff(np.signbit(y))))
+
+def audio_stats(y):
+    """Return (rms, zero_crossings) of a mono waveform"""
+    if NUMBA_AVAILABLE:
+        return _audio_stats_kernel(y)
+    # Uncompiled, the kernel's per-sample loop would be far slower than NumPy
+    return _audio_stats_numpy(y)
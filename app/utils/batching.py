@@ -0,0 +1,75 @@
+"""
+Batching helpers for grouping audio files of similar duration
+"""
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import structlog
+
+import soundfile as sf
+
+logger = structlog.get_logger(__name__)
+
+# Upper bounds (in seconds) of the duration buckets; the last bucket is open-ended
+DURATION_BUCKETS: Tuple[float, ...] = (10.0, 30.0, 120.0)
+
+# Total duration (in seconds) of a super-segment; matches Whisper's 30 s input window
+SUPERSEGMENT_DURATION = 30.0
+
+def probe_duration(audio_file: Path) -> float:
+    """Read the audio duration from the file header without decoding samples"""
+    try:
+        return sf.info(str(audio_file)).duration
+    except Exception as e:
+        # Unknown durations go to the open-ended bucket
+        logger.warning("Failed to probe audio duration", file=str(audio_file), error=str(e))
+        return float("inf")
+
+def bucket_by_duration(
+    durations: Sequence[float],
+    edges: Sequence[float] = DURATION_BUCKETS,
+    max_batch_size: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Group item indices into batches of similar duration
+
+    Items are assigned to the first bucket whose upper bound covers their
+    duration; buckets larger than `max_batch_size` are split into several batches.
+    """
+    buckets: List[List[int]] = [[] for _ in range(len(edges) + 1)]
+    for index, duration in enumerate(durations):
+        bucket = next((i for i, edge in enumerate(edges) if duration < edge), len(edges))
+        buckets[bucket].append(index)
+
+    batches = []
+    for bucket in buckets:
+        if not bucket:
+            continue
+        step = max_batch_size or len(bucket)
+        batches.extend(bucket[i:i + step] for i in range(0, len(bucket), step))
+    return batches
+
+def build_supersegments(
+    durations: Sequence[float],
+    max_duration: float = SUPERSEGMENT_DURATION
+) -> List[List[int]]:
+    """
+    Pack short items into super-segments whose total duration fits `max_duration`
+
+    Uses first-fit decreasing, so the number of super-segments stays close to
+    the minimum. Items longer than `max_duration` get a super-segment of their own.
+    """
+    order = sorted(range(len(durations)), key=lambda i: durations[i], reverse=True)
+    segments: List[List[int]] = []
+    totals: List[float] = []
+    for index in order:
+        duration = durations[index]
+        for slot, total in enumerate(totals):
+            if total + duration <= max_duration:
+                segments[slot].append(index)
+                totals[slot] = total + duration
+                break
+        else:
+            segments.append([index])
+            totals.append(duration)
+    return segments
@@ -0,0 +1,69 @@
+"""
+On-disk cache of diarization results keyed by audio content
+Repeat uploads of the same recording reuse the stored speaker turns
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Files are hashed in reads of this size so memory stays flat for long recordings
+FINGERPRINT_CHUNK_BYTES = 1024 * 1024
+
+# (start, end, speaker_id)
+SpeakerTurn = Tuple[float, float, str]
+
+_RTTM_LINE = "SPEAKER audio 1 {start:.3f} {duration:.3f} <NA> <NA> {speaker} <NA>\n"
+
+# Start, duration and speaker name columns of an RTTM SPEAKER line
+_RTTM_DTYPE = np.dtype([("start", np.float64), ("duration", np.float64), ("speaker", "U64")])
+
+def audio_fingerprint(audio_file: Path) -> str:
+    """SHA-256 over the whole file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(audio_file, "rb") as f:
+        while chunk := f.read(FINGERPRINT_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DiarizationCache:
+    """Speaker turns stored as one RTTM file per fingerprint"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.rttm"
+
+    def load(self, key: str) -> Optional[List[SpeakerTurn]]:
+        """Return cached turns, or None on a miss"""
+        path = self._path(key)
+        try:
+            if path.stat().st_size == 0:
+                return []
+            rows = np.loadtxt(path, usecols=(3, 4, 7), dtype=_RTTM_DTYPE, ndmin=1)
+        except FileNotFoundError:
+            return None
+        starts = rows["start"]
+        ends = starts + rows["duration"]
+        return list(zip(starts.tolist(), ends.tolist(), rows["speaker"].tolist()))
+
+    def save(self, key: str, turns: List[SpeakerTurn]) -> None:
+        """Store turns, replacing the file atomically"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # A unique temporary name per call, so concurrent saves of one key don't share it
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write("".join(
+                    _RTTM_LINE.format(start=start, duration=end - start, speaker=speaker)
+                    for start, end, speaker in turns
+                ))
+            os.replace(tmp_name, self._path(key))
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
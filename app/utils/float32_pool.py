@@ -0,0 +1,49 @@
+"""
+Reusable float32 sample buffers for decoding audio windows
+"""
+
+import queue
+
+import numpy as np
+
+# One Whisper input window: 30 s of 16 kHz mono audio
+WHISPER_WINDOW_SAMPLES = 30 * 16000
+
+# Maximum number of idle buffers kept around
+MAX_POOLED_BUFFERS = 32
+
+class Float32Pool:
+    """Pool of fixed-size float32 arrays shared across decode calls"""
+
+    def __init__(self, size: int = WHISPER_WINDOW_SAMPLES, max_buffers: int = MAX_POOLED_BUFFERS):
+        self.size = size
+        self.max_buffers = max_buffers
+        self._buffers: queue.SimpleQueue = queue.SimpleQueue()
+
+    def preallocate(self, count: int) -> None:
+        """Fill the pool with up to `count` buffers ahead of the first request"""
+        for _ in range(min(count, self.max_buffers) - self._buffers.qsize()):
+            self._buffers.put(np.empty(self.size, dtype=np.float32))
+
+    def acquire(self, num_samples: int) -> np.ndarray:
+        """
+        Get a buffer that can hold `num_samples` samples
+
+        Requests that fit the standard window are served from the pool and may
+        be longer than asked for; larger requests get a fresh array.
+        """
+        if num_samples > self.size:
+            return np.empty(num_samples, dtype=np.float32)
+        try:
+            return self._buffers.get_nowait()
+        except queue.Empty:
+            return np.empty(self.size, dtype=np.float32)
+
+    def release(self, buf: np.ndarray) -> None:
+        """Return a buffer to the pool; non-standard sizes are left to the GC"""
+        if buf.shape != (self.size,) or self._buffers.qsize() >= self.max_buffers:
+            return
+        self._buffers.put(buf)
+
+# Shared pool for Whisper input windows
+audio_buffer_pool = Float32Pool()
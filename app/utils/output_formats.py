@@ -3,13 +3,24 @@ Output format converters for transcription results
 Supports SRT, VTT, TXT, and JSON formats with speaker labels
 """
 
-import json
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any
+import orjson
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Per-segment line templates, shared by the single-pass writer
+_SRT_ENTRY = "{index}\n{start} --> {end}\n{text}\n\n"
+_VTT_ENTRY = "{start} --> {end}\n{text}\n\n"
+_TXT_ENTRY = "[{start} - {end}] {text}\n"
+_RTTM_ENTRY = "SPEAKER audio 1 {start:.3f} {duration:.3f} <NA> <NA> {speaker} <NA>\n"
+_CSV_ENTRY = "{start},{end},{speaker},\"{text}\"\n"
+
+# Text formats written from the segment list, in save order
+_SEGMENT_FORMATS = ("srt", "vtt", "txt", "rttm", "csv")
+
 class OutputFormatConverter:
     """Convert transcription results to various output formats"""
     
@@ -90,10 +101,7 @@ class OutputFormatConverter:
     @staticmethod
     def to_json(result: Dict[str, Any], pretty: bool = True) -> str:
         """Convert to JSON format"""
-        if pretty:
-            return json.dumps(result, indent=2, ensure_ascii=False)
-        else:
-            return json.dumps(result, ensure_ascii=False)
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
     
     @staticmethod
     def to_rttm(result: Dict[str, Any]) -> str:
@@ -165,47 +173,98 @@ class OutputFormatConverter:
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(content)
             
-            logger.info(f"Saved {format_type.upper()} output to {output_path}")
+            logger.info("Saved output", format=format_type, path=str(output_path))
             return True
             
         except Exception as e:
-            logger.error(f"Failed to save {format_type.upper()} output", error=str(e))
+            logger.error("Failed to save output", format=format_type, error=str(e))
             return False
     
+    @staticmethod
+    def write_jsonl(segments: Iterable[Dict[str, Any]], output_path: Path) -> int:
+        """Write segments to a JSON Lines file one at a time; returns the segment count"""
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        count = 0
+        with open(output_path, 'wb') as f:
+            for segment in segments:
+                f.write(orjson.dumps(segment, option=orjson.OPT_APPEND_NEWLINE))
+                count += 1
+        return count
+    
+    @staticmethod
+    def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+        """Lazily read segments back from a JSON Lines file"""
+        with open(path, 'rb') as f:
+            for line in f:
+                yield orjson.loads(line)
+    
     @staticmethod
     def save_all_formats(result: Dict[str, Any], 
                         output_dir: Path, 
                         base_name: str,
                         include_speakers: bool = True) -> Dict[str, Path]:
-        """Save result in all available formats"""
+        """Save result in all available formats with a single pass over the segments"""
         
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
         saved_files = {}
         
-        # Define formats to save
-        formats = [
-            ("json", "json"),
-            ("srt", "srt"),
-            ("vtt", "vtt"),
-            ("txt", "txt"),
-            ("rttm", "rttm"),
-            ("csv", "csv")
-        ]
-        
-        for format_name, extension in formats:
-            output_path = output_dir / f"{base_name}.{extension}"
-            
-            if OutputFormatConverter.save_to_file(
-                result, 
-                output_path, 
-                format_name,
-                include_speakers=include_speakers
-            ):
-                saved_files[format_name] = output_path
-        
-        logger.info(f"Saved {len(saved_files)} output formats to {output_dir}")
+        try:
+            json_path = output_dir / f"{base_name}.json"
+            json_path.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+            saved_files["json"] = json_path
+        except Exception as e:
+            logger.error("Failed to save JSON output", error=str(e))
+        
+        paths = {fmt: output_dir / f"{base_name}.{fmt}" for fmt in _SEGMENT_FORMATS}
+        try:
+            with ExitStack() as stack:
+                files = {
+                    fmt: stack.enter_context(open(path, 'w', encoding='utf-8'))
+                    for fmt, path in paths.items()
+                }
+                srt, vtt, txt, rttm, csv = (files[fmt] for fmt in _SEGMENT_FORMATS)
+                vtt.write("WEBVTT\n\n")
+                csv.write("start_time,end_time,speaker,text\n")
+                
+                for i, segment in enumerate(result.get("segments", [])):
+                    start = segment["start"]
+                    end = segment["end"]
+                    text = segment["text"].strip()
+                    speaker = segment.get("speaker")
+                    labelled = f"[{speaker}] {text}" if include_speakers and speaker else text
+                    
+                    srt.write(_SRT_ENTRY.format(
+                        index=i + 1,
+                        start=OutputFormatConverter._format_timestamp_srt(start),
+                        end=OutputFormatConverter._format_timestamp_srt(end),
+                        text=labelled
+                    ))
+                    vtt.write(_VTT_ENTRY.format(
+                        start=OutputFormatConverter._format_timestamp_vtt(start),
+                        end=OutputFormatConverter._format_timestamp_vtt(end),
+                        text=labelled
+                    ))
+                    txt.write(_TXT_ENTRY.format(
+                        start=OutputFormatConverter._format_timestamp_readable(start),
+                        end=OutputFormatConverter._format_timestamp_readable(end),
+                        text=labelled
+                    ))
+                    if speaker:
+                        rttm.write(_RTTM_ENTRY.format(start=start, duration=end - start, speaker=speaker))
+                    csv.write(_CSV_ENTRY.format(
+                        start=start,
+                        end=end,
+                        speaker=speaker or "unknown",
+                        text=text.replace('"', '""')
+                    ))
+            saved_files.update(paths)
+        except Exception as e:
+            logger.error("Failed to save segment outputs", error=str(e))
+        
+        logger.info("Saved output formats", count=len(saved_files), path=str(output_dir))
         return saved_files
     
     @staticmethod
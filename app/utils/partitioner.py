@@ -0,0 +1,137 @@
+"""
+Streaming partitioner for long audio files
+Splits audio into fixed-size overlapping windows without loading the whole file
+"""
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import numpy as np
+import soundfile as sf
+
+# Whisper processes 30 s of audio per window
+WINDOW_SECONDS = 30.0
+
+# Overlap between consecutive windows so words at the boundary are not cut
+OVERLAP_SECONDS = 1.0
+
+T = TypeVar("T")
+
+class _ProducerError:
+    """Carries an exception raised by the prefetch thread to the consumer"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_END = object()
+
+def iter_windows(
+    audio_file: Path,
+    window_seconds: float = WINDOW_SECONDS,
+    overlap_seconds: float = OVERLAP_SECONDS,
+    sample_rate: int = 16000
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yield (start_seconds, samples) windows of mono float32 audio at `sample_rate`
+
+    Consecutive windows share `overlap_seconds` of audio; the last window may
+    be shorter than `window_seconds`.
+    """
+    with sf.SoundFile(str(audio_file)) as f:
+        source_rate = f.samplerate
+        blocksize = int(window_seconds * source_rate)
+        overlap = int(overlap_seconds * source_rate)
+        step = blocksize - overlap
+
+        for index, block in enumerate(f.blocks(blocksize=blocksize, overlap=overlap, dtype='float32')):
+            # A trailing block made only of the previous overlap carries no new audio
+            if index > 0 and len(block) <= overlap:
+                break
+            if block.ndim > 1:
+                block = block.mean(axis=1)
+            if source_rate != sample_rate:
+                import librosa
+                block = librosa.resample(block, orig_sr=source_rate, target_sr=sample_rate)
+            yield index * step / source_rate, block
+
+def stitch_windows(
+    transcribe: Callable[[np.ndarray, Optional[str]], Tuple[Iterable[Any], str]],
+    windows: Iterable[Tuple[float, np.ndarray]],
+    language: Optional[str] = None
+) -> Tuple[List[Tuple[float, float, Any]], Optional[str]]:
+    """
+    Transcribe overlapping windows and merge their segments onto the file timeline
+
+    `transcribe(samples, language)` returns segments with window-local
+    `start`/`end` times and the detected language. Returns (start, end,
+    segment) tuples in file time and the language: the one given, or else the
+    one detected on the first window, which is then passed to the rest.
+    Segments centred in an overlap the previous window already covered are
+    dropped.
+    """
+    stitched: List[Tuple[float, float, Any]] = []
+    last_end = 0.0
+
+    for offset, samples in windows:
+        segments, detected = transcribe(samples, language)
+        language = language or detected
+        for seg in segments:
+            start = seg.start + offset
+            end = seg.end + offset
+            if (start + end) / 2 < last_end:
+                continue
+            stitched.append((start, end, seg))
+            last_end = end
+
+    return stitched, language
+
+def audio_duration(audio_file: Path) -> float:
+    """Read the audio duration in seconds from the file header"""
+    return sf.info(str(audio_file)).duration
+
+def prefetch(items: Iterator[T], depth: int = 1) -> Iterator[T]:
+    """
+    Produce `items` on a background thread, up to `depth` ahead of the consumer
+
+    Lets the next window decode while the model works on the current one.
+    Exceptions from the source are re-raised in the consumer; closing the
+    returned generator stops the thread.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_END)
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=produce, name="window-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
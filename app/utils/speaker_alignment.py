@@ -0,0 +1,80 @@
+"""
+Speaker-to-transcript alignment helpers
+Keeps diarization output as column arrays so overlaps are computed in NumPy
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.align_numba import assign_speakers
+
+@dataclass
+class SpeakerSegmentArray:
+    """
+    Speaker turns stored as parallel arrays sorted by start time
+
+    `speaker` indexes into `labels`; `end_max` is the running maximum of `end`,
+    which stays sorted even when turns overlap and bounds the binary search.
+    """
+    start: np.ndarray
+    end: np.ndarray
+    speaker: np.ndarray
+    confidence: np.ndarray
+    labels: List[str]
+    end_max: np.ndarray = None
+
+    def __post_init__(self):
+        order = np.argsort(self.start, kind="stable")
+        self.start = self.start[order]
+        self.end = self.end[order]
+        self.speaker = self.speaker[order]
+        self.confidence = self.confidence[order]
+        self.end_max = np.maximum.accumulate(self.end) if len(self.end) else self.end
+
+    @classmethod
+    def from_segments(cls, segments: Sequence) -> "SpeakerSegmentArray":
+        """Build the arrays from objects with start_time, end_time, speaker_id and confidence"""
+        labels: List[str] = []
+        label_index = {}
+        speaker = np.empty(len(segments), dtype=np.int32)
+        for i, seg in enumerate(segments):
+            if seg.speaker_id not in label_index:
+                label_index[seg.speaker_id] = len(labels)
+                labels.append(seg.speaker_id)
+            speaker[i] = label_index[seg.speaker_id]
+        return cls(
+            start=np.fromiter((seg.start_time for seg in segments), np.float64, len(segments)),
+            end=np.fromiter((seg.end_time for seg in segments), np.float64, len(segments)),
+            speaker=speaker,
+            confidence=np.fromiter((getattr(seg, "confidence", None) or 0.0 for seg in segments), np.float64, len(segments)),
+            labels=labels
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def best_speaker(self, seg_start: float, seg_end: float) -> Optional[str]:
+        """Label of the turn overlapping [seg_start, seg_end] the most, or None without overlap"""
+        # Turns before `lo` end by seg_start and turns from `hi` start after seg_end
+        lo = int(np.searchsorted(self.end_max, seg_start, side="right"))
+        hi = int(np.searchsorted(self.start, seg_end, side="left"))
+        if lo >= hi:
+            return None
+        overlap = np.minimum(seg_end, self.end[lo:hi]) - np.maximum(seg_start, self.start[lo:hi])
+        best = int(overlap.argmax())
+        if overlap[best] <= 0:
+            return None
+        return self.labels[self.speaker[lo + best]]
+
+    def assign(self, seg_starts: Sequence[float], seg_ends: Sequence[float]) -> List[Optional[str]]:
+        """Best speaker label for every transcription segment in one kernel call"""
+        best = assign_speakers(
+            np.asarray(seg_starts, dtype=np.float64),
+            np.asarray(seg_ends, dtype=np.float64),
+            self.start,
+            self.end,
+            self.end_max
+        )
+        return [self.labels[self.speaker[i]] if i >= 0 else None for i in best.tolist()]
@@ -129,7 +129,7 @@ start_service() {
     print_status "Press Ctrl+C to stop the service"
     echo ""
     
-    python -m uvicorn app.main:app --host 0.0.0.0 --port $PORT --reload
+    python -m uvicorn app.main:app --host 0.0.0.0 --port $PORT --reload --loop uvloop
 }
 
 # Function to show help
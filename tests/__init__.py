@@ -1 +1,19 @@
 # Test suite for the Whisper Diarization Service
+
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def load_module(name: str):
+    """
+    Import a single app module from its file, without running its package __init__
+
+    The app.api and app.services packages import every route and service
+    module up front, which needs the whole application; modules that don't
+    can be tested on their own this way.
+    """
+    spec = importlib.util.spec_from_file_location(name, ROOT / (name.replace(".", "/") + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,34 @@
+"""
+Tests for duration bucketing and super-segment packing of batch uploads
+"""
+
+from app.utils.batching import bucket_by_duration, build_supersegments
+
+def test_bucket_by_duration_groups_by_edges():
+    durations = [5.0, 45.0, 12.0, 200.0, 9.9, 30.0]
+    assert bucket_by_duration(durations, edges=(10.0, 30.0, 120.0)) == [[0, 4], [2], [1, 5], [3]]
+
+def test_bucket_by_duration_unknown_duration_goes_last():
+    assert bucket_by_duration([float("inf"), 1.0], edges=(10.0,)) == [[1], [0]]
+
+def test_bucket_by_duration_splits_large_buckets():
+    durations = [1.0] * 5 + [50.0]
+    assert bucket_by_duration(durations, edges=(10.0,), max_batch_size=2) == [[0, 1], [2, 3], [4], [5]]
+
+def test_bucket_by_duration_empty():
+    assert bucket_by_duration([]) == []
+
+def test_build_supersegments_first_fit_decreasing():
+    durations = [20.0, 5.0, 12.0, 8.0, 3.0]
+    segments = build_supersegments(durations, max_duration=30.0)
+    # Longest first: 20 takes 8 (28), 12 takes 5 and 3 (20)
+    assert segments == [[0, 3], [2, 1, 4]]
+
+def test_build_supersegments_respects_max_duration():
+    durations = [7.0, 11.0, 13.0, 2.0, 29.0, 6.0, 9.0]
+    segments = build_supersegments(durations, max_duration=30.0)
+    assert sorted(i for segment in segments for i in segment) == list(range(len(durations)))
+    assert all(sum(durations[i] for i in segment) <= 30.0 for segment in segments)
+
+def test_build_supersegments_long_item_stands_alone():
+    assert build_supersegments([45.0, 10.0], max_duration=30.0) == [[0], [1]]
@@ -0,0 +1,58 @@
+"""
+Tests for the on-disk diarization cache
+"""
+
+import os
+
+import pytest
+
+from app.utils.diarization_cache import DiarizationCache, FINGERPRINT_CHUNK_BYTES, audio_fingerprint
+
+def test_round_trip(tmp_path):
+    cache = DiarizationCache(tmp_path / "diar")
+    turns = [(0.0, 1.5, "SPEAKER_00"), (1.5, 4.25, "SPEAKER_01"), (4.25, 6.0, "SPEAKER_00")]
+    cache.save("abc", turns)
+    loaded = cache.load("abc")
+    assert [speaker for _, _, speaker in loaded] == [speaker for _, _, speaker in turns]
+    for (start, end, _), (loaded_start, loaded_end, _) in zip(turns, loaded):
+        assert loaded_start == pytest.approx(start, abs=1e-3)
+        assert loaded_end == pytest.approx(end, abs=1e-3)
+
+def test_single_turn_round_trip(tmp_path):
+    cache = DiarizationCache(tmp_path)
+    cache.save("one", [(2.0, 3.0, "SPEAKER_00")])
+    assert cache.load("one") == [(2.0, 3.0, "SPEAKER_00")]
+
+def test_empty_result_is_a_hit(tmp_path):
+    cache = DiarizationCache(tmp_path)
+    cache.save("silent", [])
+    assert cache.load("silent") == []
+
+def test_miss_returns_none(tmp_path):
+    assert DiarizationCache(tmp_path).load("missing") is None
+
+def test_save_leaves_no_temporary_file(tmp_path):
+    cache = DiarizationCache(tmp_path)
+    cache.save("abc", [(0.0, 1.0, "SPEAKER_00")])
+    assert [path.name for path in tmp_path.iterdir()] == ["abc.rttm"]
+
+def test_fingerprint_tracks_content(tmp_path):
+    data = os.urandom(FINGERPRINT_CHUNK_BYTES * 3)
+    first = tmp_path / "a.wav"
+    first.write_bytes(data)
+    copy = tmp_path / "b.wav"
+    copy.write_bytes(data)
+    assert audio_fingerprint(first) == audio_fingerprint(copy)
+
+    changed = tmp_path / "c.wav"
+    changed.write_bytes(data[:-1] + bytes([data[-1] ^ 0xFF]))
+    assert audio_fingerprint(changed) != audio_fingerprint(first)
+
+def test_fingerprint_covers_the_interior(tmp_path):
+    # Same size and the same edges, e.g. recordings padded with silence
+    edge = bytes(FINGERPRINT_CHUNK_BYTES)
+    first = tmp_path / "a.wav"
+    first.write_bytes(edge + b"\x01" * 1024 + edge)
+    second = tmp_path / "b.wav"
+    second.write_bytes(edge + b"\x02" * 1024 + edge)
+    assert audio_fingerprint(first) != audio_fingerprint(second)
@@ -0,0 +1,51 @@
+"""
+Tests for the in-memory batch job store
+"""
+
+from datetime import datetime, timedelta
+
+import anyio
+
+from tests import load_module
+
+# app.services' __init__ imports every service; load the job store on its own
+InMemoryJobStore = load_module("app.services.job_store").InMemoryJobStore
+
+def test_remove_finished_before_drops_only_old_jobs():
+    async def run():
+        store = InMemoryJobStore()
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        for batch_id in ("old", "recent", "running"):
+            await store.save(batch_id, {"status": "processing"})
+        # Marked out of chronological order on purpose
+        await store.mark_finished("recent", now - timedelta(hours=1))
+        await store.mark_finished("old", now - timedelta(hours=30))
+
+        removed = await store.remove_finished_before((now - timedelta(hours=24)).timestamp())
+        assert removed == 1
+        assert set(await store.all()) == {"recent", "running"}
+
+        # Nothing older than the cutoff is left, so a second pass removes nothing
+        assert await store.remove_finished_before((now - timedelta(hours=24)).timestamp()) == 0
+
+        assert await store.remove_finished_before(now.timestamp()) == 1
+        assert set(await store.all()) == {"running"}
+
+    anyio.run(run)
+
+def test_remove_finished_before_on_empty_store():
+    async def run():
+        assert await InMemoryJobStore().remove_finished_before(datetime.now().timestamp()) == 0
+
+    anyio.run(run)
+
+def test_get_status_reads_the_saved_job():
+    async def run():
+        store = InMemoryJobStore()
+        assert await store.get_status("missing") is None
+        await store.save("batch", {"status": "processing", "results": {}})
+        assert await store.get_status("batch") == "processing"
+        await store.save("batch", {"status": "cancelled"})
+        assert await store.get_status("batch") == "cancelled"
+
+    anyio.run(run)
@@ -0,0 +1,90 @@
+"""
+Tests for vectorized speaker-to-segment alignment
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from app.utils.align_numba import assign_speakers
+from app.utils.speaker_alignment import SpeakerSegmentArray
+
+@dataclass
+class Turn:
+    start_time: float
+    end_time: float
+    speaker_id: str
+    confidence: float = 0.9
+
+def reference_speaker(turns, seg_start, seg_end):
+    """The per-segment scan the kernel replaced: largest overlap wins, first turn on ties"""
+    best, best_overlap = None, 0.0
+    for turn in turns:
+        overlap = min(seg_end, turn.end_time) - max(seg_start, turn.start_time)
+        if overlap > best_overlap:
+            best, best_overlap = turn.speaker_id, overlap
+    return best
+
+# Overlapping turns given out of start order, with a gap between 14 and 20
+TURNS = [
+    Turn(5.0, 12.0, "B"),
+    Turn(0.0, 6.0, "A"),
+    Turn(10.0, 14.0, "C"),
+    Turn(3.0, 4.0, "D"),
+    Turn(20.0, 30.0, "A"),
+]
+
+SEGMENTS = [
+    (0.0, 2.0),    # only A
+    (3.0, 5.5),    # A covers more than D and B
+    (5.5, 11.0),   # B dominates
+    (11.0, 14.0),  # C dominates
+    (15.0, 19.0),  # falls in the gap
+    (13.5, 21.0),  # C 0.5 s, A 1 s
+    (31.0, 32.0),  # after every turn
+]
+
+def test_assign_matches_reference():
+    turns = SpeakerSegmentArray.from_segments(TURNS)
+    starts, ends = zip(*SEGMENTS)
+    expected = [reference_speaker(TURNS, start, end) for start, end in SEGMENTS]
+    assert turns.assign(starts, ends) == expected
+    assert expected[4] is None and expected[6] is None
+
+def test_best_speaker_matches_assign():
+    turns = SpeakerSegmentArray.from_segments(TURNS)
+    starts, ends = zip(*SEGMENTS)
+    assert [turns.best_speaker(s, e) for s, e in SEGMENTS] == turns.assign(starts, ends)
+
+def test_unsorted_input_is_sorted_with_running_end_max():
+    turns = SpeakerSegmentArray.from_segments(TURNS)
+    assert np.all(np.diff(turns.start) >= 0)
+    assert turns.end_max.tolist() == np.maximum.accumulate(turns.end).tolist()
+    # The A turn that starts first keeps end_max at 6 past the short D turn ending at 4
+    assert turns.end_max[1] == 6.0
+
+def test_tie_goes_to_earlier_turn():
+    turns = [Turn(0.0, 2.0, "A"), Turn(2.0, 4.0, "B")]
+    assert SpeakerSegmentArray.from_segments(turns).assign([1.0], [3.0]) == ["A"]
+    assert reference_speaker(turns, 1.0, 3.0) == "A"
+
+def test_touching_boundaries_do_not_overlap():
+    turns = SpeakerSegmentArray.from_segments([Turn(0.0, 2.0, "A")])
+    assert turns.assign([2.0], [3.0]) == [None]
+
+def test_empty_segments():
+    turns = SpeakerSegmentArray.from_segments(TURNS)
+    assert turns.assign([], []) == []
+
+@pytest.mark.parametrize("kernel", [
+    assign_speakers,
+    getattr(assign_speakers, "py_func", assign_speakers),  # uncompiled fallback
+])
+def test_kernel_and_fallback_agree(kernel):
+    turns = SpeakerSegmentArray.from_segments(TURNS)
+    starts = np.array([s for s, _ in SEGMENTS])
+    ends = np.array([e for _, e in SEGMENTS])
+    best = kernel(starts, ends, turns.start, turns.end, turns.end_max)
+    labels = [turns.labels[turns.speaker[i]] if i >= 0 else None for i in best.tolist()]
+    assert labels == [reference_speaker(TURNS, s, e) for s, e in SEGMENTS]
@@ -0,0 +1,85 @@
+"""
+Tests for upload validation and saving
+"""
+
+import io
+import os
+
+import anyio
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.testclient import TestClient
+
+from tests import load_module
+
+# app.api's __init__ imports the routes; load the upload helpers on their own
+_upload = load_module("app.api._upload")
+accept_upload = _upload.accept_upload
+_copy_upload = _upload._copy_upload
+
+ALLOWED_EXT = frozenset({'.wav', '.mp3'})
+MAX_BYTES = 64 * 1024
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    return tmp_path
+
+@pytest.fixture
+def client(upload_dir):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        path = await accept_upload(file, upload_dir, ALLOWED_EXT, MAX_BYTES)
+        return {"name": path.name, "size": path.stat().st_size}
+
+    return TestClient(app)
+
+def test_small_upload(client, upload_dir):
+    """A small upload is saved in one write under a generated name"""
+    content = os.urandom(1024)
+    response = client.post("/upload", files={"file": ("clip.wav", content)})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["name"].endswith(".wav")
+    assert (upload_dir / data["name"]).read_bytes() == content
+
+def test_large_upload(client, upload_dir, monkeypatch):
+    """An upload above the small-file threshold is streamed in chunks"""
+    monkeypatch.setattr(_upload, "SMALL_UPLOAD_SIZE", 1024)
+    content = os.urandom(MAX_BYTES)
+    response = client.post("/upload", files={"file": ("clip.mp3", content)})
+    assert response.status_code == 200
+    assert (upload_dir / response.json()["name"]).read_bytes() == content
+
+def test_oversized_upload(client, upload_dir):
+    """An upload over the limit returns 413 and leaves nothing on disk"""
+    response = client.post("/upload", files={"file": ("clip.wav", os.urandom(MAX_BYTES + 1))})
+    assert response.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+def test_oversized_upload_without_declared_size(upload_dir):
+    """An upload of unknown size is cut off mid-stream and the partial file removed"""
+    file = UploadFile(file=io.BytesIO(os.urandom(MAX_BYTES * 2)), filename="clip.wav")
+
+    async def save():
+        await accept_upload(file, upload_dir, ALLOWED_EXT, MAX_BYTES)
+
+    with pytest.raises(HTTPException) as exc_info:
+        anyio.run(save)
+    assert exc_info.value.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+def test_bad_extension(client, upload_dir):
+    """An unsupported extension returns 400 and leaves nothing on disk"""
+    response = client.post("/upload", files={"file": ("notes.txt", b"hello")})
+    assert response.status_code == 400
+    assert list(upload_dir.iterdir()) == []
+
+def test_copy_upload_stops_past_limit(tmp_path):
+    """The copy stops once more than `limit` bytes were written"""
+    source = tmp_path / "in.wav"
+    source.write_bytes(os.urandom(10_000))
+    with open(source, "rb") as src:
+        written = _copy_upload(src, tmp_path / "out.wav", limit=3000, chunk_size=1024)
+    assert 3000 < written < 10_000
@@ -0,0 +1,82 @@
+"""
+Tests for long-audio windowing and stitching of windowed transcripts
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.utils.partitioner import iter_windows, prefetch, stitch_windows
+
+SAMPLE_RATE = 1000
+
+def write_audio(path, seconds):
+    samples = (np.arange(seconds * SAMPLE_RATE) / (seconds * SAMPLE_RATE)).astype(np.float32)
+    sf.write(str(path), samples, SAMPLE_RATE, subtype="FLOAT")
+    return samples
+
+def test_windows_overlap_and_cover_the_file(tmp_path):
+    samples = write_audio(tmp_path / "long.wav", 70)
+    windows = list(iter_windows(tmp_path / "long.wav", sample_rate=SAMPLE_RATE))
+    assert [offset for offset, _ in windows] == [0.0, 29.0, 58.0]
+    assert [len(window) for _, window in windows] == [30000, 30000, 12000]
+    # Each window starts one second before the previous one ends
+    assert windows[1][1][0] == windows[0][1][-1000]
+    assert windows[-1][1][-1] == samples[-1]
+
+def test_short_file_is_one_window(tmp_path):
+    samples = write_audio(tmp_path / "short.wav", 30)
+    windows = list(iter_windows(tmp_path / "short.wav", sample_rate=SAMPLE_RATE))
+    assert len(windows) == 1 and windows[0][0] == 0.0 and len(windows[0][1]) == len(samples)
+
+def test_prefetch_keeps_order(tmp_path):
+    write_audio(tmp_path / "long.wav", 70)
+    direct = list(iter_windows(tmp_path / "long.wav", sample_rate=SAMPLE_RATE))
+    prefetched = list(prefetch(iter_windows(tmp_path / "long.wav", sample_rate=SAMPLE_RATE)))
+    assert [offset for offset, _ in prefetched] == [offset for offset, _ in direct]
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(prefetched, direct))
+
+def test_prefetch_reraises_source_errors():
+    def windows():
+        yield 0.0, np.zeros(1)
+        raise ValueError("corrupt block")
+
+    items = prefetch(windows())
+    assert next(items)[0] == 0.0
+    with pytest.raises(ValueError, match="corrupt block"):
+        next(items)
+
+class FakeWhisper:
+    """Returns canned segments per call, in window-local time"""
+
+    def __init__(self, outputs):
+        self.outputs = iter(outputs)
+        self.languages = []
+
+    def transcribe(self, samples, language):
+        self.languages.append(language)
+        segments = [SimpleNamespace(start=start, end=end, text=text) for start, end, text in next(self.outputs)]
+        return iter(segments), "de"
+
+def test_stitch_windows_drops_segments_repeated_in_the_overlap():
+    whisper = FakeWhisper([
+        [(0.0, 10.0, "first"), (27.5, 29.5, "boundary")],
+        # Window two starts at 29 s: its first segment is the boundary one again
+        [(0.0, 0.5, "boundary"), (1.0, 3.0, "second")],
+    ])
+    windows = [(0.0, np.zeros(1)), (29.0, np.zeros(1))]
+
+    stitched, language = stitch_windows(whisper.transcribe, iter(windows))
+
+    assert [seg.text for _, _, seg in stitched] == ["first", "boundary", "second"]
+    assert [(start, end) for start, end, _ in stitched] == [(0.0, 10.0), (27.5, 29.5), (30.0, 32.0)]
+    # The language detected on the first window is reused for the rest
+    assert language == "de"
+    assert whisper.languages == [None, "de"]
+
+def test_stitch_windows_keeps_the_given_language():
+    whisper = FakeWhisper([[(0.0, 1.0, "hello")]])
+    _, language = stitch_windows(whisper.transcribe, [(0.0, np.zeros(1))], "en")
+    assert language == "en" and whisper.languages == ["en"]